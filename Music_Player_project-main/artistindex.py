@@ -0,0 +1,64 @@
+from searchindex import normalise
+
+
+class ArtistIndex:
+    def __init__(self):
+        # normalised artist name -> {track: None}; a dict keeps tracks in the order
+        # they were added and removes one in O(1)
+        self.primary = {}      # tracks where the name is the main artist
+        self.featured = {}     # tracks where the name is one of the additional artists
+        self.names = {}        # normalised name -> name as first written, for display
+
+    def add(self, track):
+        self.file(self.primary, track.artist, track)
+        for name in track.adds.iter():
+            self.file(self.featured, name, track)
+
+    def file(self, table, name, track):
+        key = normalise(name)
+        if not key:
+            return
+        self.names.setdefault(key, name.strip())
+        table.setdefault(key, {})[track] = None
+
+    def remove(self, track):
+        self.unfile(self.primary, track.artist, track)
+        for name in track.adds.iter():
+            self.unfile(self.featured, name, track)
+
+    def unfile(self, table, name, track):
+        key = normalise(name)
+        tracks = table.get(key)
+        if tracks is None:
+            return
+        tracks.pop(track, None)
+        if not tracks:
+            del table[key]
+            if key not in self.primary and key not in self.featured:
+                self.names.pop(key, None)
+
+    def clear(self):
+        self.primary.clear()
+        self.featured.clear()
+        self.names.clear()
+
+
+
+    # LOOKUPS
+    # Each one only touches the tracks it returns.
+    # -----------------------------------------------------------
+
+    def display_name(self, name):
+        return self.names.get(normalise(name), name)
+
+    def tracks_by(self, name):
+        return list(self.primary.get(normalise(name), ()))
+
+    def featuring(self, name):
+        return list(self.featured.get(normalise(name), ()))
+
+    def all_tracks(self, name):
+        key = normalise(name)
+        tracks = dict(self.primary.get(key, {}))
+        tracks.update(self.featured.get(key, {}))
+        return list(tracks)
@@ -1,3 +1,4 @@
+import sys
 
 class BaseUI:
     def display_header(self, title):
@@ -14,4 +15,19 @@ class BaseUI:
         start = (page - 1) * page_size
         end = start + page_size
         return items[start:end]
- 
+
+    def format_track(self, index, track):
+        artist_string = track.artist
+        if track.adds.size > 0:
+            artist_string += ", " + ", ".join(track.adds.iter())
+
+        return (f"[{index}]\n"
+                f"Title: {track.title}\n"
+                f"Artist: {artist_string}\n"
+                f"Album: {track.album}\n"
+                f"Duration: {track.duration}\n")
+
+    def write_lines(self, lines):
+        # one buffered write per screen instead of a print per line
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
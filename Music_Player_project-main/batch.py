@@ -0,0 +1,77 @@
+import argparse
+import json
+import sys
+
+from service import PlayerService
+
+
+# BATCH RUNNER
+# Runs player commands without the menus. Input is one JSON object per line:
+#     {"cmd": "add_track", "args": {"title": "...", "artist": "...", "album": "...", "duration": "03:20"}}
+# and every command answers with one JSON line on stdout:
+#     {"ok": true, "result": ...}   or   {"ok": false, "error": "..."}
+# The library and session are saved once at the end instead of after every command.
+# -----------------------------------------------------------
+
+def run(service, lines, out):
+    failed = 0
+    buffer = []
+
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Each line must be a JSON object")
+            reply = {"ok": True, "result": service.execute(request.get("cmd"), request.get("args"))}
+        except (ValueError, KeyError, OSError) as e:
+            reply = {"ok": False, "error": str(e)}
+            failed += 1
+        except Exception as e:
+            # a bug in one command must not lose the work of the others, see the save in main()
+            reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            failed += 1
+
+        buffer.append(json.dumps(reply))
+        if len(buffer) >= 1000:
+            out.write("\n".join(buffer) + "\n")
+            buffer = []
+
+    if buffer:
+        out.write("\n".join(buffer) + "\n")
+    out.flush()
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run music player commands from a file or stdin.")
+    parser.add_argument("script", nargs="?", default="-", help="file of JSON commands, - for stdin")
+    parser.add_argument("--no-save", action="store_true", help="skip the save at the end")
+    options = parser.parse_args(argv)
+
+    # one save at the end replaces a journal append (and fsync) per added track
+    service = PlayerService(load=False, journal=False)
+    loaded = True
+    try:
+        service.load()
+    except Exception as e:
+        # commands still run against what was read, but nothing is written back
+        print(f"Could not load the library, nothing will be saved: {e}", file=sys.stderr)
+        loaded = False
+
+    if options.script == "-":
+        failed = run(service, sys.stdin, sys.stdout)
+    else:
+        with open(options.script, "r") as file:
+            failed = run(service, file, sys.stdout)
+
+    if loaded and not options.no_save:
+        service.save()
+    return 1 if failed or not loaded else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,374 @@
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from itertools import islice
+
+import models
+from linkedlist import LinkedList
+from playlistui import PlaylistUI
+from queueui import QueueUI
+from service import PlayerService
+from sortedview import SortedView
+from library import SNAPSHOT_FILE
+
+# BENCHMARKS
+# Each library size runs in its own process, so peak memory is per size and
+# one run cannot warm the next. Libraries are generated from a fixed seed, so
+# two commits benchmark exactly the same data. Results are written as JSON;
+# --compare prints the change against an earlier results file.
+#
+#   python bench.py                         10k, 100k and 1M tracks
+#   python bench.py --sizes 10000 --output new.json --compare old.json
+#
+# Every step is run several times like timeit does. The fastest run is the
+# one reported and compared, the median is shown next to it.
+# -----------------------------------------------------------
+
+SIZES = (10_000, 100_000, 1_000_000)
+SEED = 2024
+SAMPLES = 50            # random positions for get / index_of / remove_at
+SEARCHES = 50
+NEXT_STEPS = 1000
+SLOWER = 1.20           # --compare flags anything this much slower
+REPEAT = 5              # timed runs per step, after one warm-up run
+LONG_STEP = 1.0         # seconds; a step this slow counts its first run and stops at 3
+
+SYLLABLES = ("la", "mo", "ri", "ka", "sun", "ve", "to", "na", "el", "dar", "mi", "so",
+             "ne", "ro", "lu", "ta", "fe", "in", "cor", "da", "bel", "an", "ki", "ra")
+
+
+
+# SYNTHETIC LIBRARY
+# Words are built from syllables, about 4000 of them, so titles repeat
+# words the way real ones do. Roughly one artist per 20 tracks and one
+# album per 10, with a featured artist on every tenth track.
+# -----------------------------------------------------------
+
+def make_words(rng, count=4000):
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3))))
+    return sorted(words)
+
+
+def make_records(size, seed=SEED):
+    # a generator, so a million tracks never sit in memory as dicts
+    rng = random.Random(seed)
+    words = make_words(rng)
+
+    def name(count):
+        return " ".join(rng.choice(words) for _ in range(count)).title()
+
+    artists = [name(rng.randint(1, 2)) for _ in range(max(1, size // 20))]
+    albums = [name(rng.randint(1, 3)) for _ in range(max(1, size // 10))]
+
+    for i in range(size):
+        yield {
+            "title": name(rng.randint(1, 4)),
+            "artist": rng.choice(artists),
+            "additional_artists": [rng.choice(artists)] if i % 10 == 0 else [],
+            "album": rng.choice(albums),
+            "duration": f"{rng.randint(1, 7):02d}:{rng.randint(0, 59):02d}"
+        }
+
+
+def write_ndjson(filename, records):
+    with open(filename, "w") as file:
+        for record in records:
+            file.write(json.dumps(record) + "\n")
+
+
+def misspell(text, rng):
+    letters = list(text)
+    i = rng.randrange(len(letters))
+    letters[i] = rng.choice("aeiourstln")
+    return "".join(letters)
+
+
+
+# TIMING
+# A step runs once untimed to warm up, then `repeat` timed runs. A step that
+# changes what it works on gets a setup, run untimed before every run, whose
+# result is handed to the action. Steps slower than LONG_STEP hardly suffer
+# from noise: their first run is timed too and they stop after three runs.
+# The value of the last run is returned.
+# -----------------------------------------------------------
+
+class Timer:
+    def __init__(self, trace=False, repeat=REPEAT):
+        self.results = {}
+        self.trace = trace
+        self.repeat = max(1, repeat)
+
+    def run(self, name, action, ops=1, setup=None):
+        times = []
+        peak = 0
+        value = None
+        wanted = self.repeat
+        warm_up = True
+
+        while len(times) < wanted:
+            value = None     # the previous result, a whole library maybe, goes before the next setup
+            state = setup() if setup is not None else None
+            if self.trace:
+                tracemalloc.start()
+            started = time.perf_counter()
+            value = action(state) if setup is not None else action()
+            seconds = time.perf_counter() - started
+            if self.trace:
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+            del state
+
+            if warm_up:
+                warm_up = False
+                if seconds < LONG_STEP:
+                    continue
+                wanted = min(wanted, 3)
+            times.append(seconds)
+
+        times.sort()
+        result = {"seconds": round(times[0], 6), "median": round(times[len(times) // 2], 6),
+                  "runs": len(times), "ops": ops}
+        if self.trace:
+            result["peak_bytes"] = peak
+        self.results[name] = result
+        return value
+
+
+def quiet(action):
+    # the UI methods print their result, keep that out of the report
+    def run():
+        with redirect_stdout(io.StringIO()):
+            return action()
+    return run
+
+
+def bench_linkedlist(timer, tracks, rng):
+    size = len(tracks)
+    picks = [rng.randrange(size) for _ in range(SAMPLES)]
+
+    for indexed in (False, True):
+        kind = "indexed" if indexed else "plain"
+
+        def add_all(items):
+            for track in tracks:
+                items.add(track)
+            return items
+        items = timer.run(f"linkedlist.add.{kind}", add_all, size,
+                          setup=lambda: LinkedList(indexed=indexed))
+
+        timer.run(f"linkedlist.get.{kind}",
+                  lambda: [items.get(i) for i in picks], SAMPLES)
+        timer.run(f"linkedlist.index_of.{kind}",
+                  lambda: [items.index_of(tracks[i]) for i in picks], SAMPLES)
+        # every run removes SAMPLES more, a small share of the list
+        timer.run(f"linkedlist.remove_at.{kind}",
+                  lambda: [items.remove_at(rng.randrange(items.size)) for _ in picks], SAMPLES)
+
+
+def bench_library(timer, workdir, size, rng):
+    source = os.path.join(workdir, "import.ndjson")
+    timer.run("generate", lambda: write_ndjson(source, make_records(size)), size)
+
+    # load the saved library first, one copy at a time, then import the one that is kept
+    service = PlayerService(load=False, journal=False)
+    service.engine.import_file(source)
+    del service
+
+    def load(fresh):
+        fresh.engine.load_library()
+    timer.run("library.load_library.snapshot", load, size, setup=lambda: PlayerService(load=False))
+    os.remove(SNAPSHOT_FILE)
+    timer.run("library.load_library.json", load, size, setup=lambda: PlayerService(load=False))
+
+    def import_all(service):
+        service.engine.import_file(source)
+        return service
+    service = timer.run("library.import_tracks", import_all, size,
+                        setup=lambda: PlayerService(load=False, journal=False))
+    engine = service.engine
+    os.remove(source)
+    timer.run("library.save_library", engine.save_library, size)
+
+    # show_library pages over the sorted view, build it from scratch once
+    tracks = service.library.to_list()
+
+    def sort_library():
+        view = SortedView()
+        for track in tracks:
+            view.add(track)
+        return list(islice(view.iter_from(size // 2), 10))
+    timer.run("library.show_library.sort", sort_library, size)
+    timer.run("library.show_library.page",
+              lambda: [list(islice(engine.sorted_view.iter_from(rng.randrange(size)), 10))
+                       for _ in range(SEARCHES)], SEARCHES)
+
+    queries = []
+    for _ in range(SEARCHES):
+        track = rng.choice(tracks)
+        queries.append(rng.choice((track.title, track.artist, track.album, track.title[:3])))
+    timer.run("library.search_track.exact",
+              lambda: [engine.search_index.search(q) for q in queries], SEARCHES)
+
+    typos = [misspell(rng.choice(tracks).title.split()[0], rng) for _ in range(SEARCHES)]
+    timer.run("library.search_track.fuzzy",
+              lambda: [engine.search_index.fuzzy_search(q) for q in typos], SEARCHES)
+    return service
+
+
+def bench_queue(timer, service):
+    size = service.library.size
+    service.create_playlist("bench")
+    plist = service.find_playlist("bench")
+    plist.add_tracks(service.library.iter())
+
+    playlist_ui = PlaylistUI(service.playlists, service.library, service.queue, service.engine)
+    timer.run("playlist.calculate_duration", lambda: playlist_ui.calculate_duration(plist.tracks), size)
+    timer.run("playlist.total_duration", lambda: plist.total_duration, 1)
+
+    queue = service.queue
+    queue_ui = QueueUI(queue)
+    queue.load(plist)
+
+    lazy = models.LAZY_SHUFFLE_SIZE
+    for kind, threshold in (("lazy", 0), ("eager", size + 1)):
+        models.LAZY_SHUFFLE_SIZE = threshold
+        try:
+            timer.run(f"queue.shuffle_on.{kind}", lambda state: quiet(queue_ui.shuffle_on)(), 1,
+                      setup=queue.shuffle_off)
+            timer.run(f"queue.next.{kind}",
+                      lambda: [queue.next() for _ in range(NEXT_STEPS)], NEXT_STEPS)
+            timer.run(f"queue.shuffle_off.{kind}", lambda state: quiet(queue_ui.shuffle_off)(), 1,
+                      setup=queue.shuffle_on)
+        finally:
+            models.LAZY_SHUFFLE_SIZE = lazy
+
+
+
+# ONE SIZE, IN A CHILD PROCESS
+# -----------------------------------------------------------
+
+def run_size(size, trace, repeat):
+    rng = random.Random(SEED)
+    timer = Timer(trace, repeat)
+    workdir = tempfile.mkdtemp(prefix="bench_")
+    home = os.getcwd()
+    os.chdir(workdir)    # the library writes songs.json and friends to the working directory
+    try:
+        service = bench_library(timer, workdir, size, rng)
+        bench_linkedlist(timer, service.library.to_list(), rng)
+        bench_queue(timer, service)
+    finally:
+        os.chdir(home)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "size": size,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "timings": timer.results
+    }
+
+
+def run_child(size, trace, repeat):
+    command = [sys.executable, os.path.abspath(__file__), "--child", str(size), "--repeat", str(repeat)]
+    if trace:
+        command.append("--tracemalloc")
+    child = subprocess.run(command, stdout=subprocess.PIPE, text=True)
+    if child.returncode != 0:
+        # usually the out of memory killer on the largest size, keep the other results
+        reason = f"killed by signal {-child.returncode}" if child.returncode < 0 else f"exit code {child.returncode}"
+        return {"size": size, "error": reason}
+    return json.loads(child.stdout)
+
+
+
+# REPORT
+# -----------------------------------------------------------
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_report(report, baseline=None):
+    previous = {}
+    if baseline is not None:
+        if baseline.get("tracemalloc", False) != report["tracemalloc"]:
+            print("Note: only one of the two runs used --tracemalloc, which slows every step down.")
+        for run in baseline["runs"]:
+            previous[run["size"]] = run.get("timings", {})
+
+    for run in report["runs"]:
+        if "error" in run:
+            print(f"\n--- {run['size']} tracks: failed, {run['error']} ---")
+            continue
+        print(f"\n--- {run['size']} tracks (peak RSS {run['peak_rss_kb'] / 1024:.1f} MB) ---")
+        before = previous.get(run["size"], {})
+        for name, result in run["timings"].items():
+            per_op = result["seconds"] / result["ops"]
+            median = result.get("median", result["seconds"])
+            line = f"{name:34} {result['seconds']:10.4f} s  (median {median:.4f})  {per_op * 1e6:12.2f} us/op"
+            if "peak_bytes" in result:
+                line += f"  {result['peak_bytes'] / 2 ** 20:8.1f} MB"
+            old = before.get(name)
+            if old is not None and old["seconds"] > 0:
+                ratio = result["seconds"] / old["seconds"]
+                line += f"  x{ratio:.2f}" + ("  SLOWER" if ratio >= SLOWER else "")
+            print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the music player on synthetic libraries.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--output", default="bench_results.json", help="where to write the JSON results")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--tracemalloc", action="store_true", help="also record peak allocations per step (slower)")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="timed runs per step, the fastest is reported")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    options = parser.parse_args(argv)
+
+    if options.child is not None:
+        json.dump(run_size(options.child, options.tracemalloc, options.repeat), sys.stdout)
+        return 0
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": SEED,
+        "tracemalloc": options.tracemalloc,
+        "repeat": options.repeat,
+        "runs": []
+    }
+    for size in options.sizes:
+        print(f"Benchmarking {size} tracks...", file=sys.stderr)
+        report["runs"].append(run_child(size, options.tracemalloc, options.repeat))
+
+    with open(options.output, "w") as file:
+        json.dump(report, file, indent=2)
+
+    baseline = None
+    if options.compare:
+        with open(options.compare, "r") as file:
+            baseline = json.load(file)
+    print_report(report, baseline)
+    return 1 if any("error" in run for run in report["runs"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
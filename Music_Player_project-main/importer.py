@@ -0,0 +1,263 @@
+import json
+
+CHUNK_SIZE = 1 << 16      # characters read from the file at a time
+BATCH_SIZE = 5000         # records handed to the caller at a time
+MAX_RECORD = 16 << 20     # characters one record may span, a longer one is treated as malformed
+
+NUMBER_CHARS = "0123456789+-.eE"
+
+decoder = json.JSONDecoder()
+
+
+def skip_space(buffer, pos):
+    while pos < len(buffer) and buffer[pos] in " \t\r\n":
+        pos += 1
+    return pos
+
+
+
+# STREAM RECORDS FROM A JSON ARRAY OR NDJSON FILE
+# Only the current chunk and the record being decoded are held in memory,
+# so the file can be larger than RAM. With raw=True NDJSON lines are yielded
+# undecoded so the decoding can happen in a worker process.
+# -----------------------------------------------------------
+
+def iter_records(file, raw=False):
+    buffer = file.read(CHUNK_SIZE)
+    pos = skip_space(buffer, 0)
+    while pos == len(buffer):
+        more = file.read(CHUNK_SIZE)
+        if not more:
+            return
+        buffer += more
+        pos = skip_space(buffer, pos)
+
+    if buffer[pos] == "[":
+        yield from iter_array(file, buffer, pos + 1)
+    else:
+        yield from iter_lines(file, buffer[pos:], raw)
+
+
+def read_more(file, tail):
+    # at least as much again as is already held, so a record spanning many
+    # chunks is joined a logarithmic number of times, not once per chunk
+    if len(tail) > MAX_RECORD:
+        raise ValueError(f"Record longer than {MAX_RECORD} characters")
+    parts = [tail]
+    wanted = max(CHUNK_SIZE, len(tail))
+    read = 0
+    while read < wanted:
+        more = file.read(CHUNK_SIZE)
+        if not more:
+            return "".join(parts), True
+        parts.append(more)
+        read += len(more)
+    return "".join(parts), False
+
+
+def is_incomplete(error, buffer):
+    # the decoder ran off the end of the buffer, as opposed to a syntax error inside it
+    return error.pos >= len(buffer) - 6 or error.msg.startswith("Unterminated string")
+
+
+def iter_array(file, buffer, pos):
+    eof = False
+    empty = True          # nothing decoded yet, "]" may close the array right away
+    after_value = False   # an element was just decoded, "," or "]" must follow
+    while True:
+        pos = skip_space(buffer, pos)
+        if pos == len(buffer):
+            if eof:
+                raise ValueError("Malformed JSON: the array is not closed")
+            buffer, eof = read_more(file, "")
+            pos = 0
+            continue
+
+        char = buffer[pos]
+        if char == "]" and (after_value or empty):
+            return
+        if after_value:
+            if char != ",":
+                raise ValueError("Malformed JSON: expected ',' or ']' after an element")
+            pos += 1
+            after_value = False
+            continue
+        if char in ",]":
+            raise ValueError("Malformed JSON: expected an element")
+
+        try:
+            record, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            if eof or not is_incomplete(e, buffer):
+                raise ValueError(f"Malformed JSON: {e.msg}")
+            buffer, eof = read_more(file, buffer[pos:])     # drop what was already decoded
+            pos = 0
+            continue
+
+        # a number or literal may continue in the next chunk ("1.5e" then "+300"),
+        # wait until something that cannot be part of it follows
+        if not eof and not isinstance(record, (dict, list, str)) and not buffer[end:].strip(NUMBER_CHARS):
+            buffer, eof = read_more(file, buffer[pos:])
+            pos = 0
+            continue
+
+        yield record
+        pos = end
+        empty = False
+        after_value = True
+
+
+def iter_lines(file, first, raw=False):
+    parts = []      # pieces of the line that has not ended yet
+    held = 0
+    chunk = first
+    while chunk:
+        end = chunk.find("\n")
+        if end < 0:
+            parts.append(chunk)
+            held += len(chunk)
+            if held > MAX_RECORD:
+                raise ValueError(f"Record longer than {MAX_RECORD} characters")
+        else:
+            parts.append(chunk[:end])
+            lines = chunk[end + 1:].split("\n")
+            lines[0:0] = ["".join(parts)]
+            tail = lines.pop()
+            for line in lines:
+                if line.strip():
+                    yield line if raw else json.loads(line)
+            parts = [tail]
+            held = len(tail)
+        chunk = file.read(CHUNK_SIZE)
+
+    pending = "".join(parts)
+    if pending.strip():
+        yield pending if raw else json.loads(pending)
+
+
+def iter_batches(records, size=BATCH_SIZE):
+    batch = []
+    try:
+        for record in records:
+            batch.append(record)
+            if len(batch) == size:
+                yield batch
+                batch = []
+    except ValueError:
+        # the records read before the malformed one are still imported
+        if batch:
+            yield batch
+        raise
+    if batch:
+        yield batch
+
+
+
+# NORMALISE ONE RECORD
+# Runs in worker processes, so it only uses plain data and returns a tuple:
+# (title, artist, additional artists, album, duration in seconds or None).
+# A batch stops at the first record that cannot be used and returns the
+# records before it along with the error.
+# -----------------------------------------------------------
+
+def split_artists(raw):
+    if raw is None:
+        return []
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    elif not isinstance(raw, (list, tuple)):
+        raw = [raw]
+    names = []
+    for name in raw:
+        if name is None:
+            continue
+        cleaned = str(name).strip()
+        if cleaned != "":
+            names.append(cleaned)
+    return names
+
+
+def parse_seconds(raw):
+    if isinstance(raw, int):
+        return raw if raw >= 0 else None
+    if not isinstance(raw, str) or raw.count(":") != 1:
+        return None
+
+    minutes_text, seconds_text = raw.strip().split(":")
+    if not minutes_text.isdigit() or not seconds_text.isdigit():
+        return None
+
+    seconds = int(seconds_text)
+    if seconds >= 60:
+        return None
+    return int(minutes_text) * 60 + seconds
+
+
+def text_field(item, name):
+    # a missing field and null are both empty, not the text "None"
+    value = item.get(name)
+    return "" if value is None else str(value)
+
+
+def normalise_record(item):
+    if isinstance(item, str):      # raw NDJSON line
+        item = json.loads(item)
+    return (text_field(item, "title"),
+            text_field(item, "artist"),
+            split_artists(item.get("additional_artists")),
+            text_field(item, "album"),
+            parse_seconds(item.get("duration", "")))
+
+
+def normalise_batch(batch):
+    records = []
+    for item in batch:
+        try:
+            records.append(normalise_record(item))
+        except (ValueError, TypeError, AttributeError) as e:
+            return records, str(e)
+    return records, None
+
+
+
+# NORMALISE BATCHES, OPTIONALLY IN PARALLEL
+# With workers > 1 batches of raw NDJSON lines go to a process pool. Only a few
+# batches are in flight at once so memory stays bounded, and results come back
+# in file order. Records from a JSON array are already decoded and are always
+# normalised here, sending them to a worker costs more than it saves.
+# -----------------------------------------------------------
+
+def iter_normalised(batches, workers=1):
+    batches = iter(batches)
+    first = next(batches, None)
+    if first is None:
+        return
+
+    if workers <= 1 or not isinstance(first[0], str):
+        yield normalise_batch(first)
+        for batch in batches:
+            yield normalise_batch(batch)
+        return
+
+    # imported here, only large imports use it and it is slow to import at startup
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    # not fork: the menu's loader and writer threads are running and the library
+    # lock is held, a forked child would inherit them mid-operation
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method)) as pool:
+        in_flight = [pool.submit(normalise_batch, first)]
+        try:
+            for batch in batches:
+                in_flight.append(pool.submit(normalise_batch, batch))
+                if len(in_flight) >= workers * 2:
+                    yield in_flight.pop(0).result()
+        except ValueError:
+            # batches read before the malformed record still come back first
+            for future in in_flight:
+                yield future.result()
+            raise
+
+        for future in in_flight:
+            yield future.result()
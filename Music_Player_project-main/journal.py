@@ -0,0 +1,111 @@
+import json
+import os
+import threading
+
+
+# WRITE A FILE ATOMICALLY
+# The chunks of bytes go to a temporary file first and it is renamed over the
+# target, so a crash mid-write leaves the old file intact.
+# -----------------------------------------------------------
+
+def write_atomic(filename, chunks):
+    temp = filename + ".tmp"
+    with open(temp, "wb") as file:
+        file.writelines(chunks)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp, filename)
+
+
+def write_json(filename, data):
+    write_atomic(filename, [json.dumps(data).encode("utf-8")])     # dumps uses the C encoder, dump does not
+
+
+class Journal:
+    def __init__(self, filename):
+        self.filename = filename
+        self.entries = 0       # records written since the last compaction
+        self.pending = []      # queued lines not written yet, see queue()
+        self.lock = threading.Lock()
+
+
+
+    # APPEND ONE RECORD
+    # One JSON object per line, so adding a track costs one short write.
+    # -----------------------------------------------------------
+
+    def append(self, record):
+        with open(self.filename, "a") as file:
+            file.write(json.dumps(record) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        self.entries += 1
+
+
+
+    # QUEUE RECORDS, WRITE THEM LATER
+    # queue() only keeps the line in memory; write_pending() appends everything
+    # queued so far with one write and one fsync. They may run on different threads.
+    # -----------------------------------------------------------
+
+    def queue(self, record):
+        line = json.dumps(record) + "\n"
+        with self.lock:
+            self.pending.append(line)
+            self.entries += 1
+
+    def write_pending(self):
+        with self.lock:
+            lines = self.pending
+            self.pending = []
+        if not lines:
+            return
+
+        with open(self.filename, "a") as file:
+            file.write("".join(lines))
+            file.flush()
+            os.fsync(file.fileno())
+
+    def drop_pending(self):
+        # the records are already part of a full save
+        with self.lock:
+            self.pending = []
+            self.entries = 0
+
+
+
+    # READ BACK EVERY RECORD
+    # A torn last line (crash during append) is cut off the file, otherwise the
+    # next append would be glued onto it and lost along with every later record.
+    # -----------------------------------------------------------
+
+    def replay(self):
+        self.entries = 0
+        try:
+            file = open(self.filename, "rb")
+        except FileNotFoundError:
+            return
+
+        good = 0        # byte offset just after the last complete record
+        torn = False
+        with file:
+            for line in file:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("no end of line")
+                    record = json.loads(line)
+                except ValueError:
+                    torn = True
+                    break
+                good += len(line)
+                self.entries += 1
+                yield record
+
+        if torn:
+            os.truncate(self.filename, good)
+
+    def clear(self):
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+        with self.lock:
+            self.entries = len(self.pending)
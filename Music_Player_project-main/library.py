@@ -1,14 +1,45 @@
 import json
+import os
+import struct
+import sys
+import threading
+import time
+from itertools import islice
 from baseui import BaseUI
-from models import Track
+from models import Track, NO_ADDS, format_duration
 from linkedlist import LinkedList
+from searchindex import SearchIndex, MAX_ID, normalise
+from artistindex import ArtistIndex
+from sortedview import SortedView
+from journal import Journal, write_atomic, write_json
+from importer import iter_records, iter_batches, iter_normalised
+from snapshot import Snapshot, pack_snapshot
+
+LIBRARY_FILE = "songs.json"
+JOURNAL_FILE = "songs.journal"
+SNAPSHOT_FILE = "songs.snapshot"     # binary copy of songs.json for fast startup
+COMPACT_EVERY = 500       # journal records before songs.json is rewritten
+PARALLEL_IMPORT_BYTES = 32 * 1024 * 1024    # imports above this size are parsed by a process pool
+READ_ONLY_MESSAGE = "The library could not be loaded, no tracks can be added until the player is restarted."
 
 
 class LibraryUI(BaseUI):
-    def __init__(self, library, playlists, albums):
+    def __init__(self, library, playlists, albums, tracks_by_id=None, writer=None):
         self.library = library
         self.playlists = playlists
         self.albums = albums
+        self.tracks_by_id = tracks_by_id if tracks_by_id is not None else {}    # id -> Track
+        self.next_id = 1
+        self.album_index = {}    # casefolded album name -> Album, mirrors self.albums
+        self.search_index = SearchIndex()
+        self.artist_index = ArtistIndex()    # artist and featured artist -> tracks
+        self.fingerprints = {}               # normalised (title, artist, album, seconds) -> Track
+        self.sorted_view = SortedView()    # library kept in display order
+        self.journal = Journal(JOURNAL_FILE)
+        self.writer = writer                 # BackgroundWriter, or None to write before returning
+        self.lock = threading.RLock()        # held while the library changes or is copied for saving
+        self.save_lock = threading.Lock()    # one writer of the library files at a time
+        self.read_only = False               # set when loading failed, songs.json is not rewritten
         
 
     def validate_duration(self, raw):
@@ -45,88 +76,46 @@ class LibraryUI(BaseUI):
             print("Your library is empty.")
             return
 
-        tracks = []
-        node = self.library.head
-        while node is not None:
-            tracks.append(node.data)
-            node = node.next
-
-        def compare(a, b):
-            if a.title.lower() < b.title.lower(): 
-                return -1
-            if a.title.lower() > b.title.lower():
-                return 1
-
-            if a.artist.lower() < b.artist.lower():
-                return -1
-            if a.artist.lower() > b.artist.lower():
-                return 1
-
-            if a.album.lower() < b.album.lower():
-                return -1
-            if a.album.lower() > b.album.lower():
-                return 1
-
-            if a.duration < b.duration:
-                return -1
-            if a.duration > b.duration:
-                return 1
-
-            return 0
-
-        def merge(left, right):
-            result = []
-            i = 0
-            j = 0
-
-            while i < len(left) and j < len(right):
-                if compare(left[i], right[j]) <= 0:
-                    result.append(left[i])
-                    i += 1
-                else:
-                    result.append(right[j])
-                    j += 1
-
-            while i < len(left):
-                result.append(left[i])
-                i += 1
-
-            while j < len(right):
-                result.append(right[j])
-                j += 1
-
-            return result
-
-        def mergee(arr):
-            if len(arr) <= 1:
-                return arr
+        page = 1
+        page_size = 10
+        total = len(self.sorted_view)
 
-            mid = len(arr) // 2
-            left = mergee(arr[:mid])
-            right = mergee(arr[mid:])
+        while True:
+            start = (page - 1) * page_size
+            lines = [f"\n--- MUSIC LIBRARY (Page {page}) ---\n"]
 
-            return merge(left, right)
+            index = start + 1
+            for track in islice(self.sorted_view.iter_from(start), page_size):
+                lines.append(self.format_track(index, track))
+                index += 1
 
-        sorted_tracks = mergee(tracks)
+            lines.append("[N] Next Page")
+            lines.append("[P] Previous Page")
+            lines.append("[E] Exit")
+            self.write_lines(lines)
 
-        print("\n--- MUSIC LIBRARY ---")
+            choice = input("Choose: ").strip().lower()
 
-        index = 1
-        for track in sorted_tracks:
-            add_artists = track.adds.to_list()
-            if len(add_artists) > 0:
-                artist_string = track.artist + ", " + ", ".join(add_artists)
+            if choice == "n":
+                if page * page_size < total:
+                    page += 1
+                else:
+                    print("No more pages.")
+            elif choice == "p":
+                if page > 1:
+                    page -= 1
+                else:
+                    print("Already at first page.")
+            elif choice == "e":
+                return
             else:
-                artist_string = track.artist
-                
-            print(f"[{index}]")
-            print(f"Title: {track.title}")
-            print(f"Artist: {artist_string}")
-            print(f"Album: {track.album}")
-            print(f"Duration: {track.duration}\n")
-            index += 1
+                print("Invalid option.")
 
     def add_track(self):
+        if self.read_only:
+            print(READ_ONLY_MESSAGE)
+            return
+
         add_artist = LinkedList()
 
         t = input("please add the name of your track: ")
@@ -153,69 +142,73 @@ class LibraryUI(BaseUI):
         d = self.validate_duration(d)
 
         tr = Track(t, a, add_artist, al, d)
-        self.library.add(tr)
-        self.add_to_album(tr)
-        self.save_library()
+        self.store_track(tr)
 
 
         print("\nTrack added!")
     
     def search_track(self):
-        query = input("Enter track title to search: ").strip().lower()
+        query = input("Enter title, artist or album to search: ").strip().lower()
         
 
         if not query:
             print("Search cancelled.")
             return
 
-        exact_matches = []
-        partial_matches = []
+        results = self.search_index.search(query)
+        title = "Search Results"
 
-        node = self.library.head
-        while node is not None:
-            title_lower = node.data.title.lower()
+        if len(results) == 0:
+            # nothing matched as typed, try again allowing for typos
+            results = self.search_index.fuzzy_search(query)
+            title = "Did you mean"
 
-            if title_lower == query:
-                exact_matches.append(node.data)
-            elif query in title_lower:
-                partial_matches.append(node.data)
+        if len(results) == 0:
+            print("No matching tracks found.")
+            return
 
-            node = node.next
+        self.show_tracks(title, results)
 
-        results = exact_matches + partial_matches
+    def show_artist(self):
+        name = input("Enter artist name: ").strip()
 
-        if len(results) == 0:
-            print("No matching tracks found.")
+        if not name:
+            print("Search cancelled.")
+            return
+
+        own = self.artist_index.tracks_by(name)
+        featured = self.artist_index.featuring(name)
+
+        if not own and not featured:
+            print("No tracks found for that artist.")
             return
 
+        display = self.artist_index.display_name(name)
+        print(f"\n{display}: {len(own)} track(s), featured on {len(featured)} more.")
+        if own:
+            self.show_tracks(f"Tracks by {display}", own)
+        if featured:
+            self.show_tracks(f"Tracks featuring {display}", featured)
+
+    def show_tracks(self, title, results):
         page = 1
         page_size = 10
 
         while True:
             page_items = self.paginate(results, page_size, page)
 
-            print(f"\n--- Search Results (Page {page}) ---\n")
+            lines = [f"\n--- {title} (Page {page}) ---\n"]
 
             index = (page - 1) * page_size + 1
 
             for track in page_items:
-                add_artists = track.adds.to_list()
-                if len(add_artists) > 0:
-                    artist_string = track.artist + ", " + ", ".join(add_artists)
-                else:
-                    artist_string = track.artist
-
-                print(f"[{index}]")
-                print(f"Title: {track.title}")
-                print(f"Artist: {artist_string}")
-                print(f"Album: {track.album}")
-                print(f"Duration: {track.duration}\n")
-
+                lines.append(self.format_track(index, track))
                 index += 1
 
-            print("[N] Next Page")
-            print("[P] Previous Page")
-            print("[E] Exit")
+            lines.append("[N] Next Page")
+            lines.append("[P] Previous Page")
+            lines.append("[E] Exit")
+            self.write_lines(lines)
 
             choice = input("Choose: ").strip().lower()
 
@@ -234,115 +227,355 @@ class LibraryUI(BaseUI):
             else:
                 print("Invalid option.")
 
+    def tracks_by_artist(self, name):
+        return self.artist_index.all_tracks(name)
+
+    def tracks_on_album(self, name):
+        album = self.album_index.get(name.casefold())
+        if album is None:
+            return []
+        return album.tracks.to_list()
+
+    def register_track(self, track):
+        # ids from the files are only kept when they are usable and not taken yet
+        track_id = track.id
+        if not isinstance(track_id, int) or isinstance(track_id, bool) \
+                or not 0 < track_id <= MAX_ID or track_id in self.tracks_by_id:
+            track.id = self.next_id
+        self.next_id = max(self.next_id, track.id + 1)
+        self.tracks_by_id[track.id] = track
+
+        self.library.add(track)
+        self.add_to_album(track)
+        self.search_index.add(track)
+        self.artist_index.add(track)
+        self.sorted_view.add(track)
+        self.fingerprints.setdefault(self.fingerprint(track), track)
+
+    def fingerprint(self, track):
+        return (normalise(track.title), normalise(track.artist),
+                normalise(track.album), track.seconds)
+
+
+
+    # UPDATE A TRACK IN PLACE
+    # Keeps its id, library node and playlist references, and re-files it in
+    # every index the change affects.
+    # -----------------------------------------------------------
+
+    def update_track(self, track, title, artist, adds, album, seconds):
+        old_key = self.sorted_view.sort_key(track)
+        old_album = track.album.casefold()
+
+        self.search_index.remove(track)
+        self.artist_index.remove(track)
+        if old_album != album.casefold():
+            self.remove_from_album(track)
+
+        track.title = title
+        track.artist = sys.intern(artist)
+        track.adds = adds if adds.size > 0 else NO_ADDS
+        track.album = sys.intern(album)
+        track.seconds = seconds
+
+        self.search_index.add(track)
+        self.artist_index.add(track)
+        if old_album != album.casefold():
+            self.add_to_album(track)
+        if self.sorted_view.sort_key(track) != old_key:
+            self.sorted_view.remove(track)
+            self.sorted_view.add(track)
+
+    def merge_track(self, track, adds):
+        known = {normalise(name) for name in track.adds.iter()}
+        merged = track.adds.copy()
+        for name in adds.iter():
+            if normalise(name) not in known:
+                merged.add(name)
+                known.add(normalise(name))
+
+        if merged.size == track.adds.size:
+            return
+        self.update_track(track, track.title, track.artist, merged, track.album, track.seconds)
+
     def add_to_album(self, track):
-        node = self.albums.head
-        while node is not None:
-            if node.data.name.lower() == track.album.lower():
-                node.data.tracks.add(track)
-                return
-            node = node.next
+        key = track.album.casefold()
+        album = self.album_index.get(key)
+        if album is not None:
+            if track.id not in album.track_ids:
+                album.tracks.add(track)
+                album.track_ids.add(track.id)
+            return
 
         from models import Album
         new_album = Album(track.album)
         new_album.tracks.add(track)
+        new_album.track_ids.add(track.id)
         self.albums.add(new_album)
+        self.album_index[key] = new_album
+
+    def remove_from_album(self, track):
+        key = track.album.casefold()
+        album = self.album_index.get(key)
+        if album is None:
+            return False
+
+        if track.id not in album.track_ids:
+            return False
+        album.tracks.remove_at(album.tracks.index_of(track))
+        album.track_ids.discard(track.id)
+
+        if album.tracks.size == 0:
+            self.albums.remove_at(self.albums.index_of(album))
+            del self.album_index[key]
+        return True
 
 
     def import_tracks(self):
-        filename = input("Enter JSON filename to import: ").strip()
+        if self.read_only:
+            print(READ_ONLY_MESSAGE)
+            return
 
-        try:
-            with open(filename, "r") as file:
-                data = json.load(file)
-        except:
+        filename = input("Enter JSON or NDJSON filename to import: ").strip()
+
+        if not os.path.isfile(filename):
             print("Failed to open JSON file.")
             return
 
-        count = 0
+        policy = input("Tracks already in the library: [S]kip, [M]erge artists or [R]eplace? (default S): ").strip().lower()
+
+        def progress(count, rate):
+            print(f"  {count} tracks read ({rate:.0f} tracks/s)")
 
-        for item in data:
-            t = item.get("title", "")
-            a = item.get("artist", "")
-            adds_list = item.get("additional_artists", [])
-            al = item.get("album", "")
-            d = item.get("duration", "")
+        try:
+            result = self.import_file(filename, policy, progress)
+        except OSError:
+            print("Failed to open JSON file.")
+            return
 
-            adds = LinkedList()
-            for x in adds_list:
-                adds.add(x)
+        if result["error"]:
+            print(f"Import stopped at a malformed record: {result['error']}")
+        print(f"{result['added']} tracks imported successfully.")
+        if result["duplicates"] > 0:
+            action = {'s': "skipped", 'm': "merged", 'r': "replaced"}[result["policy"]]
+            print(f"{result['duplicates']} duplicate(s) of tracks already in the library {action}.")
 
-            tr = Track(t, a, adds, al, d)
-            self.library.add(tr)
-            self.add_to_album(tr)
-            count += 1
+    def import_file(self, filename, policy='s', progress=None):
+        # non-interactive import, progress(count, rate) is called after every batch
+        self.check_writable()
+        if policy not in ('m', 'r'):
+            policy = 's'
 
-        print(f"{count} tracks imported successfully.")
+        count = 0
+        added = 0
+        duplicates = 0
+        error = None
+        started = time.perf_counter()
+
+        workers = 1
+        if os.path.getsize(filename) >= PARALLEL_IMPORT_BYTES:
+            workers = os.cpu_count() or 1
+
+        with open(filename, "r") as file, self.lock:
+            try:
+                batches = iter_batches(iter_records(file, raw=workers > 1))
+                for batch, failed in iter_normalised(batches, workers):
+                    for t, a, adds_list, al, seconds in batch:
+                        adds = LinkedList()
+                        for x in adds_list:
+                            adds.add(x)
+                        tr = Track(t, a, adds, al, seconds)
+
+                        # O(1) duplicate check on the normalised fingerprint
+                        existing = self.fingerprints.get(self.fingerprint(tr))
+                        if existing is None:
+                            self.register_track(tr)
+                            added += 1
+                            continue
+
+                        duplicates += 1
+                        if policy == 'm':
+                            self.merge_track(existing, adds)
+                        elif policy == 'r':
+                            self.update_track(existing, t, a, adds, al, seconds)
+                    count += len(batch)
+
+                    if progress is not None:
+                        elapsed = time.perf_counter() - started
+                        progress(count, count / elapsed if elapsed > 0 else 0)
+                    if failed is not None:
+                        error = failed
+                        break
+            except (ValueError, TypeError, AttributeError) as e:
+                error = str(e)
+
+        if count > 0:
+            self.request_save()
+        return {"read": count, "added": added, "duplicates": duplicates,
+                "policy": policy, "error": error}
     
     
+    def track_record(self, track):
+        return {
+            "id": track.id,
+            "title": track.title,
+            "artist": track.artist,
+            "additional_artists": track.adds.to_list(),
+            "album": track.album,
+            "duration": track.duration
+        }
+
+    def track_from_record(self, item):
+        adds = LinkedList()
+        for x in item.get("additional_artists", []):
+            adds.add(x)
+
+        return Track(item.get("title", ""), item.get("artist", ""), adds,
+                     item.get("album", ""), item.get("duration", ""), item.get("id"))
+
+    def store_track(self, track):
+        # a track added by hand: indexed now, written to disk with one journal append
+        self.check_writable()
+        with self.lock:
+            self.register_track(track)
+        self.journal_track(track)
+
+    def check_writable(self):
+        # after a failed load next_id only knows the tracks that were read, a new
+        # track could get the id of one still in songs.json
+        if self.read_only:
+            raise ValueError(READ_ONLY_MESSAGE)
+
+    def journal_track(self, track):
+        record = {"op": "add", "track": self.track_record(track)}
+        if self.writer is None:
+            self.journal.append(record)
+        else:
+            # tracks added close together share one append and fsync
+            self.journal.queue(record)
+            self.writer.schedule("journal", self.write_journal)
+
+        if self.journal.entries >= COMPACT_EVERY:
+            self.request_save()
+
+    def write_journal(self):
+        with self.save_lock:
+            self.journal.write_pending()
+
+    def request_save(self):
+        if self.writer is None:
+            self.save_library()
+        else:
+            self.writer.schedule("library", self.save_library)
+
     def save_library(self):
-        data = {"library": [], "albums": []}
+        if self.read_only:
+            return
 
-        node = self.library.head
-        while node is not None:
-            track = node.data
-            add_artists = track.adds.to_list()
+        with self.save_lock:
+            # only a flat copy is taken while the library is locked, so adding a
+            # track never waits for songs.json and the snapshot to be built
+            with self.lock:
+                tracks, albums = self.library_rows()
+                self.journal.drop_pending()
+
+            data = self.library_data(tracks, albums)
+            chunks = pack_snapshot(tracks)
+
+            # songs.json now holds everything the journal had, so the journal can go
+            write_json(LIBRARY_FILE, data)
+            write_atomic(SNAPSHOT_FILE, chunks)
+            self.journal.clear()
+
+    def library_rows(self):
+        # (id, title, artist, additional artists, album, seconds) per track, copied
+        # because update_track changes tracks in place; and (name, track ids) per album
+        tracks = [(t.id, t.title, t.artist, t.adds.to_list() if t.adds.size else (), t.album, t.seconds)
+                  for t in self.library.iter()]
+        albums = [(album.name, [t.id for t in album.tracks.iter()]) for album in self.albums.iter()]
+        return tracks, albums
+
+    def library_data(self, tracks, albums):
+        data = {"library": [], "albums": []}
 
+        for track_id, title, artist, adds, album, seconds in tracks:
             data["library"].append({
-                "title": track.title,
-                "artist": track.artist,
-                "additional_artists": add_artists,
-                "album": track.album,
-                "duration": track.duration
+                "id": track_id,
+                "title": title,
+                "artist": artist,
+                "additional_artists": list(adds),
+                "album": album,
+                "duration": format_duration(seconds) if seconds is not None else ""
             })
 
-            node = node.next
-
-        album_node = self.albums.head
-        while album_node is not None:
-            album = album_node.data
-            track_titles = []
-            tnode = album.tracks.head
-            while tnode is not None:
-                track_titles.append(tnode.data.title)
-                tnode = tnode.next
-
+        for name, track_ids in albums:
             data["albums"].append({
-                "name": album.name,
-                "tracks": track_titles
+                "name": name,
+                "track_ids": track_ids
             })
-
-            album_node = album_node.next
-
-        with open("songs.json", "w") as file:
-            json.dump(data, file)
+        return data
 
     
         
-    def load_library(self):
+    def snapshot_is_current(self):
         try:
-            with open("songs.json", "r") as file:
-                data = json.load(file)
-        except:
-            return
-
-        self.library.clear()
-        self.albums.clear()
+            return os.path.getmtime(SNAPSHOT_FILE) >= os.path.getmtime(LIBRARY_FILE)
+        except OSError:
+            return False
 
+    def load_snapshot(self):
+        try:
+            snapshot = Snapshot(SNAPSHOT_FILE)
+        except (OSError, ValueError):
+            return False
 
+        try:
+            for tr in snapshot.iter_tracks():
+                self.register_track(tr)
+        except (ValueError, struct.error, IndexError):      # UnicodeDecodeError is a ValueError
+            # damaged after the header, drop what it gave and read songs.json instead
+            self.clear_library()
+            return False
+        finally:
+            snapshot.close()
+        return True
 
-        for item in data.get("library", []):
-            t = item["title"]
-            a = item["artist"]
-            adds_list = item["additional_artists"]
-            al = item["album"]
-            d = item["duration"]
-
-            adds = LinkedList()
-            for x in adds_list:
-                adds.add(x)
-
-            tr = Track(t, a, adds, al, d)
-            self.library.add(tr)
-            self.add_to_album(tr)
-
-
+    def load_library(self):
+        with self.lock:
+            try:
+                self.read_library()
+            except Exception:
+                # what was loaded is incomplete, writing it back would lose the rest
+                self.read_only = True
+                raise
+
+    def clear_library(self):
+        self.library.clear()
+        self.albums.clear()
+        self.album_index.clear()
+        self.search_index.clear()
+        self.artist_index.clear()
+        self.fingerprints.clear()
+        self.sorted_view.clear()
+        self.tracks_by_id.clear()
+        self.next_id = 1
+
+    def read_library(self):
+        self.clear_library()
+
+        if not (self.snapshot_is_current() and self.load_snapshot()):
+            try:
+                with open(LIBRARY_FILE, "r") as file:
+                    data = json.load(file)
+            except FileNotFoundError:
+                data = {}     # first start, any other error leaves the library read only
+
+            for item in data.get("library", []):
+                self.register_track(self.track_from_record(item))
+
+        # tracks added since songs.json was last written; a crash between writing
+        # songs.json and removing the journal leaves records that are already loaded
+        for record in self.journal.replay():
+            track = record.get("track") if isinstance(record, dict) else None
+            if isinstance(track, dict) and record.get("op") == "add" and track.get("id") not in self.tracks_by_id:
+                self.register_track(self.track_from_record(track))
@@ -1,22 +1,199 @@
+from itertools import chain
 
 
 class Node:
+    __slots__ = ("data", "next", "prev")      # no per-node __dict__, there is one node per track
+
     def __init__(self, data):
         self.data = data        # track or playlist object
         self.next = None
         self.prev = None        # doubly linked list for easy backwards navigation
 
 
-class LinkedList:
+BLOCK = 512        # node handles per block of a NodeIndex
+
+
+# NODE INDEX
+# The node handles of an indexed list, in list order, kept in blocks of up to
+# about BLOCK handles plus a Fenwick tree over the block sizes. Finding the node
+# at an index, the index of a node, inserting and removing all cost O(log n)
+# plus one block, also after removals in the middle of the list.
+# -----------------------------------------------------------
+
+class NodeIndex:
+    __slots__ = ("blocks", "owner", "tree", "where", "dirty", "size")
+
     def __init__(self):
+        self.blocks = []      # lists of nodes, in list order
+        self.owner = {}       # node -> the block holding it
+        self.tree = [0]       # Fenwick tree over the block sizes (1-based)
+        self.where = {}       # id(block) -> its index in blocks
+        self.dirty = False    # blocks were added or removed, tree and where are rebuilt on next use
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        return chain.from_iterable(self.blocks)
+
+    def rebuild(self):
+        count = len(self.blocks)
+        tree = [0] * (count + 1)
+        for i, block in enumerate(self.blocks, 1):
+            tree[i] += len(block)
+            parent = i + (i & -i)
+            if parent <= count:
+                tree[parent] += tree[i]
+        self.tree = tree
+        self.where = {id(block): i for i, block in enumerate(self.blocks)}
+        self.dirty = False
+
+    def grow(self, block_index, amount):
+        if self.dirty:
+            return
+        i = block_index + 1
+        tree = self.tree
+        while i < len(tree):
+            tree[i] += amount
+            i += i & -i
+
+    def before(self, block_index):
+        # nodes in the blocks ahead of this one
+        total = 0
+        i = block_index
+        tree = self.tree
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def locate(self, index):
+        # (block index, offset in the block) of the node at index
+        if self.dirty:
+            self.rebuild()
+        tree = self.tree
+        block = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            nxt = block + step
+            if nxt < len(tree) and tree[nxt] <= index:
+                block = nxt
+                index -= tree[nxt]
+            step >>= 1
+        return block, index
+
+    def get(self, index):
+        block, offset = self.locate(index)
+        return self.blocks[block][offset]
+
+    def position(self, node):
+        block = self.owner.get(node)
+        if block is None:
+            return -1
+        if self.dirty:
+            self.rebuild()
+        return self.before(self.where[id(block)]) + block.index(node)
+
+    def append(self, node):
+        blocks = self.blocks
+        if not blocks or len(blocks[-1]) >= BLOCK:
+            blocks.append([node])
+            self.dirty = True
+        else:
+            blocks[-1].append(node)
+            self.grow(len(blocks) - 1, 1)
+        self.owner[node] = blocks[-1]
+        self.size += 1
+
+    def extend(self, nodes):
+        # fills the last block, then adds whole blocks at once
+        blocks = self.blocks
+        start = 0
+        if blocks and len(blocks[-1]) < BLOCK:
+            last = blocks[-1]
+            start = min(BLOCK - len(last), len(nodes))
+            last.extend(nodes[:start])
+            self.owner.update(dict.fromkeys(nodes[:start], last))
+            self.grow(len(blocks) - 1, start)
+        for at in range(start, len(nodes), BLOCK):
+            block = nodes[at:at + BLOCK]
+            blocks.append(block)
+            self.owner.update(dict.fromkeys(block, block))
+            self.dirty = True
+        self.size += len(nodes)
+
+    def insert(self, index, nodes):
+        if index >= self.size:
+            self.extend(nodes)
+            return
+
+        block_index, offset = self.locate(index)
+        block = self.blocks[block_index]
+        block[offset:offset] = nodes
+        self.size += len(nodes)
+
+        if len(block) <= 2 * BLOCK:
+            for node in nodes:
+                self.owner[node] = block
+            self.grow(block_index, len(nodes))
+            return
+
+        # too big now, cut it into full blocks
+        pieces = [block[i:i + BLOCK] for i in range(0, len(block), BLOCK)]
+        for piece in pieces:
+            for node in piece:
+                self.owner[node] = piece
+        self.blocks[block_index:block_index + 1] = pieces
+        self.dirty = True
+
+    def pop(self, index):
+        block_index, offset = self.locate(index)
+        block = self.blocks[block_index]
+        node = block.pop(offset)
+        del self.owner[node]
+        self.size -= 1
+
+        if not block:
+            del self.blocks[block_index]
+            self.dirty = True
+        elif len(block) < BLOCK // 4 and block_index + 1 < len(self.blocks) \
+                and len(block) + len(self.blocks[block_index + 1]) <= BLOCK:
+            # fold a small block into the next one so blocks don't fragment
+            following = self.blocks.pop(block_index + 1)
+            for moved in following:
+                self.owner[moved] = block
+            block.extend(following)
+            self.dirty = True
+        else:
+            self.grow(block_index, -1)
+        return node
+
+
+
+class LinkedList:
+    __slots__ = ("head", "tail", "size", "indexed", "nodes", "handles", "shares")
+
+    def __init__(self, indexed=False):
         self.head = None
         self.tail = None
         self.size = 0      
 
+        # optional index: node handles in list order plus data -> nodes,
+        # so get, remove_at and index_of don't have to walk from head
+        self.indexed = indexed
+        self.nodes = NodeIndex() if indexed else None
+        self.handles = {} if indexed else None
+
+        # how many other owners are sharing this list (playlist loaded into the queue).
+        # An owner that wants to change a shared list must copy() it first.
+        self.shares = 0
+
 
 
     # ADD NODE AT END 
     # this method adds a new node with the given data at the end of the linked list.
+    # The new node is returned so callers can keep it as a handle.
     # -------------------------------------------------------
     def add(self, data):
         new_node = Node(data)
@@ -32,6 +209,124 @@ class LinkedList:
 
         self.size += 1
 
+        if self.indexed:
+            self.nodes.append(new_node)
+            self.handles.setdefault(data, []).append(new_node)
+
+        return new_node
+
+
+
+    # ADD MANY ITEMS AT END
+    # The new nodes are chained first and then spliced onto the tail in one step.
+    # Returns how many items were added.
+    # -------------------------------------------------------
+
+    def extend(self, items):
+        first = None
+        last = None
+        count = 0
+        added = [] if self.indexed else None
+        for data in items:
+            new_node = Node(data)
+            if first is None:
+                first = new_node
+            else:
+                last.next = new_node
+                new_node.prev = last
+            last = new_node
+            count += 1
+
+            if self.indexed:
+                added.append(new_node)
+                self.handles.setdefault(data, []).append(new_node)
+
+        if first is None:
+            return 0
+        if self.indexed:
+            self.nodes.extend(added)
+
+        # splice the chain onto the tail
+        if self.head is None:
+            self.head = first
+        else:
+            self.tail.next = first
+            first.prev = self.tail
+        self.tail = last
+        self.size += count
+        return count
+
+
+
+    # SPLICE ANOTHER LIST IN
+    # This method moves every node of other into this list right after node
+    # (at the front when node is None). No nodes are copied, other is left empty.
+    # -------------------------------------------------------
+
+    def splice_after(self, node, other):
+        if other.head is None:
+            return 0
+
+        first = other.head
+        last = other.tail
+        count = other.size
+        index = handles = moved = None
+        if self.indexed and other.indexed:
+            index, handles = other.nodes, other.handles     # taken over, clear() gives other new ones
+        elif self.indexed:
+            moved = list(other.iter_nodes())
+        other.clear()
+
+        after = node.next if node is not None else self.head
+        first.prev = node
+        last.next = after
+        if node is not None:
+            node.next = first
+        else:
+            self.head = first
+        if after is not None:
+            after.prev = last
+        else:
+            self.tail = last
+        self.size += count
+
+        if self.indexed:
+            at = self.position(node) + 1 if node is not None else 0
+            if index is not None and len(self.nodes) == 0:
+                self.nodes = index
+            else:
+                self.nodes.insert(at, list(index) if index is not None else moved)
+
+            if handles is None:
+                for new_node in moved:
+                    self.handles.setdefault(new_node.data, []).append(new_node)
+            elif not self.handles:
+                self.handles = handles
+            else:
+                for data, same in handles.items():
+                    self.handles.setdefault(data, []).extend(same)
+        return count
+
+    def concat(self, other):
+        return self.splice_after(self.tail, other)
+
+
+
+    # COPY
+    # Returns a new list with the same data in new nodes. If mapping is given it
+    # is filled with old node -> new node, so node handles can be carried over.
+    # -------------------------------------------------------
+
+    def copy(self, mapping=None):
+        new_list = LinkedList(self.indexed)
+        current = self.head
+        while current:
+            new_node = new_list.add(current.data)
+            if mapping is not None:
+                mapping[current] = new_node
+            current = current.next
+        return new_list
+
 
 
     # REMOVE BY INDEX
@@ -42,10 +337,33 @@ class LinkedList:
         if index < 0 or index >= self.size:
             return False
 
-        current = self.head
-        for _ in range(index):
-            current = current.next
+        if self.indexed:
+            current = self.nodes.pop(index)
+            self.unlink(current)
+            self.forget(current)
+        else:
+            self.unlink(self.node_at(index))
+        return True
+
+
+
+    # REMOVE BY NODE HANDLE
+    # This method removes a node returned by add() or node_at() without walking the list.
+    # -----------------------------------------------------------
+
+    def remove_node(self, node):
+        if self.indexed:
+            index = self.position(node)
+            if index == -1:
+                return False
+            self.nodes.pop(index)
+            self.unlink(node)
+            self.forget(node)
+        else:
+            self.unlink(node)
+        return True
 
+    def unlink(self, current):
         # unlink current node
         if current.prev:     # middle or tail
             current.prev.next = current.next
@@ -57,27 +375,69 @@ class LinkedList:
         else:
             self.tail = current.prev      # removing tail
 
+        current.prev = None
+        current.next = None
         self.size -= 1
-        return True
 
+    def forget(self, node):
+        same = self.handles[node.data]
+        same.remove(node)
+        if not same:
+            del self.handles[node.data]
 
 
-    # GET DATA BY INDEX
-    # This method retrieves the data at a specific index in the linked list.
+
+    # POSITION OF A NODE HANDLE (indexed lists only)
     # -----------------------------------------------------------
-    
-    def get(self, index):
+
+    def position(self, node):
+        return self.nodes.position(node)
+
+
+
+    # NODE BY INDEX
+    # This method returns the node handle at a specific index.
+    # -----------------------------------------------------------
+
+    def node_at(self, index):
         if index < 0 or index >= self.size:
             return None
 
+        if self.indexed:
+            return self.nodes.get(index)
+
         current = self.head
         for _ in range(index):
             current = current.next
+        return current
+
+
+
+    # GET DATA BY INDEX
+    # This method retrieves the data at a specific index in the linked list.
+    # -----------------------------------------------------------
+    
+    def get(self, index):
+        current = self.node_at(index)
+        if current is None:
+            return None
 
         return current.data
 
 
 
+    # NODE ITERATOR
+    # Same as iter() but yields the node handles themselves.
+    # -----------------------------------------------------------
+
+    def iter_nodes(self):
+        current = self.head
+        while current:
+            yield current
+            current = current.next
+
+
+
     # ITERATOR (HOW YOU LOOP OVER IT)
     # This method allows you to iterate over the linked list using a for loop.
     # -----------------------------------------------------------
@@ -95,6 +455,12 @@ class LinkedList:
     # ------------------------------------------------------------
     
     def index_of(self, data):
+        if self.indexed:
+            same = self.handles.get(data)
+            if not same:
+                return -1
+            return min(self.position(node) for node in same)
+
         current = self.head
         idx = 0
         while current:
@@ -113,6 +479,9 @@ class LinkedList:
         self.head = None
         self.tail = None
         self.size = 0
+        if self.indexed:
+            self.nodes = NodeIndex()
+            self.handles = {}
 
 
     
@@ -138,11 +507,4 @@ class LinkedList:
         self.clear()    
         for item in items:
             self.add(item)
-            
-    
-    # CLEAR THE LINKED LIST
-    # This method clears the linked list by setting head to None.
-    # -----------------------------------------------------------        
-    def clear(self):
-        self.head = None
 
@@ -1,30 +1,92 @@
-import os
-print("RUNNING FROM:", os.getcwd())
+import time
+STARTED = time.perf_counter()     # for --startup-time
 
-from models import Track, Playlist, MusicQueue
-from linkedlist import LinkedList
-from library import LibraryUI
+import os
+import sys
+import threading
 from playlistui import PlaylistUI
 from queueui import QueueUI
+from service import PlayerService
+from session import session_data, SESSION_FILE
+from journal import write_json
+from writer import BackgroundWriter
+
+# Menu choices that use the library, playlists or queue and so wait until they are loaded
+NEEDS_DATA = ("1", "2", "3", "4", "5", "6", "7", "8")
 
 class Ui:
-    def __init__(self):
-        # 1. Initialize Data Structures
-        self.library = LinkedList()      # LinkedList of Track objects
-        self.playlists = LinkedList()    # LinkedList of Playlist objects
-        self.queue = MusicQueue()        # The main Queue object
-        self.albums = LinkedList()
+    def __init__(self, background=True, startup_time=False):
+        # 1. Create the library, playlists and queue (shared with batch.py through PlayerService)
+        #    Saves are written by a background thread so the menu never waits on the disk
+        self.writer = BackgroundWriter()
+        self.service = PlayerService(load=False, writer=self.writer)
+        self.library = self.service.library          # LinkedList of Track objects
+        self.playlists = self.service.playlists      # LinkedList of Playlist objects
+        self.queue = self.service.queue              # The main Queue object
+        self.albums = self.service.albums
+        self.tracks_by_id = self.service.tracks_by_id    # track id -> Track, shared by every screen
 
         # 2. Initialize UI Managers
-        self.library_ui = LibraryUI(self.library, self.playlists, self.albums)
-        self.library_ui.load_library()
+        self.library_ui = self.service.engine
         
         # UPDATE: Pass self.queue here so we can load playlists into the queue
-        self.playlist_ui = PlaylistUI(self.playlists, self.library, self.queue)
+        self.playlist_ui = PlaylistUI(self.playlists, self.library, self.queue, self.library_ui)
         
         self.queue_ui = QueueUI(self.queue)
 
+        # 3. Load them, by default behind the menu so it shows up right away
+        self.startup_time = startup_time
+        self.ready = threading.Event()
+        self.load_error = None
+        self.error_reported = False
+        if background:
+            threading.Thread(target=self.load, name="library-loader", daemon=True).start()
+        else:
+            self.load()
+            self.report_load_error()
+
+    def load(self):
+        try:
+            self.service.load()
+        except Exception as e:
+            # the library is read only now, see LibraryUI.load_library
+            self.load_error = e
+        finally:
+            self.ready.set()
+        if self.startup_time:
+            elapsed = (time.perf_counter() - STARTED) * 1000
+            print(f"\n[startup] library ready after {elapsed:.0f} ms ({self.library.size} tracks)", file=sys.stderr)
+
+    def wait_ready(self):
+        if not self.ready.is_set():
+            print("Loading library...")
+            self.ready.wait()
+        self.report_load_error()
+
+    def report_load_error(self):
+        if self.load_error is not None and not self.error_reported:
+            self.error_reported = True
+            print(f"Could not load the library: {self.load_error}")
+            print("songs.json and session.json will not be rewritten until the player is restarted.")
+
+    def save_session(self):
+        # before loading finished, or after it failed, the session on disk is the only complete copy
+        if not self.ready.is_set() or self.load_error is not None:
+            return
+
+        # the state is copied now, the file is written later (once for several saves in a row)
+        data = session_data(self.playlists, self.queue)
+        self.writer.schedule("session", lambda: write_json(SESSION_FILE, data))
+
     def mainmenu(self):
+        try:
+            self.menu_loop()
+        finally:
+            # also on Ctrl+C or end of input: everything scheduled reaches the disk before exit
+            self.writer.close()
+
+    def menu_loop(self):
+        first = True
         while True:
             print("\n--- Music Player ---")
             print("1. View Music Library")
@@ -34,30 +96,71 @@ class Ui:
             print("5. Play Queue")
             print("6. Search Track")
             print("7. Import Tracks")
-            print("8. Exit")
+            print("8. Browse Artist")
+            print("9. Exit")
+
+            if first and self.startup_time:
+                elapsed = (time.perf_counter() - STARTED) * 1000
+                print(f"[startup] first menu after {elapsed:.0f} ms", file=sys.stderr)
+            first = False
+
+            if self.ready.is_set():
+                self.report_load_error()
 
             choice = input("Enter choice: ")
 
+            if choice in NEEDS_DATA:
+                self.wait_ready()
+
             if choice == "1":
                 self.library_ui.show_library()
             elif choice == "2":
                 self.library_ui.add_track()
             elif choice == "3":
                 self.playlist_ui.create_playlist()
+                self.save_session()
             elif choice == "4":
                 self.playlist_ui.show_playlists()
+                self.save_session()
             elif choice == "5":
                 self.queue_ui.show_queue()
+                self.save_session()
             elif choice ==  "6":
                 self.library_ui.search_track()
             elif choice == "7":
                 self.library_ui.import_tracks()
             elif choice == "8":
+                self.library_ui.show_artist()
+            elif choice == "9":
+                self.save_session()
                 print("Exiting...")
                 break
             else:
                 print("Invalid input!")
                 continue
 
-ui = Ui()
-ui.mainmenu()
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Music player")
+    parser.add_argument("--profile", nargs="?", const="summary", metavar="FILE",
+                        help="time library, playlist and queue operations and print a summary on exit, "
+                             "with FILE also write cProfile stats there (or set MUSIC_PLAYER_PROFILE)")
+    parser.add_argument("--profile-blocks", action="store_true",
+                        help="with --profile, also count allocated memory blocks per call, slow on a large "
+                             "library (or set MUSIC_PLAYER_PROFILE_BLOCKS)")
+    parser.add_argument("--eager-load", action="store_true",
+                        help="load the library before showing the menu instead of in the background")
+    parser.add_argument("--startup-time", action="store_true",
+                        help="report how long the first menu and the library took to be ready")
+    options = parser.parse_args()
+
+    profile = options.profile or os.environ.get("MUSIC_PLAYER_PROFILE")
+    if profile:
+        import profiler
+        count_blocks = options.profile_blocks or bool(os.environ.get("MUSIC_PLAYER_PROFILE_BLOCKS"))
+        profiler.enable(profile, count_blocks)
+
+    # cProfile only sees the thread that enabled it, so a stats file needs the load on this one
+    background = not options.eager_load and (not profile or profile == "summary")
+    ui = Ui(background=background, startup_time=options.startup_time)
+    ui.mainmenu()
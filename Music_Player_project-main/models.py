@@ -1,29 +1,313 @@
+import random
+import sys
 from linkedlist import LinkedList
+from shuffle import LazyShuffle
+
+LAZY_SHUFFLE_SIZE = 5000     # queues this long are shuffled on demand instead of up front
+
+# Shared by every track without additional artists, so those tracks don't each carry
+# an empty LinkedList. Never add to it directly.
+NO_ADDS = LinkedList()
+
+
+def parse_duration(text):
+    try:
+        minutes, seconds = text.split(":")
+        return int(minutes) * 60 + int(seconds)
+    except (AttributeError, ValueError):
+        return None
+
+
+def format_duration(seconds):
+    m, s = divmod(seconds, 60)
+    return f"{m:02d}:{s:02d}"
+
 
 class Track:
-    def __init__(self, title, artist, adds, album, duration):
+    __slots__ = ("id", "title", "artist", "adds", "album", "seconds")
+
+    def __init__(self, title, artist, adds, album, duration, track_id=None):
+        self.id = track_id        # stable id, assigned by LibraryUI.register_track
         self.title = title
-        self.artist = artist
-        self.adds = adds
-        self.album = album
+        self.artist = sys.intern(artist)     # artists and albums repeat across tracks
+        self.adds = adds if adds.size > 0 else NO_ADDS
+        self.album = sys.intern(album)
         self.duration = duration
 
+    # duration is kept as whole seconds, "mm:ss" is only built for display and saving
+    @property
+    def duration(self):
+        if self.seconds is None:
+            return ""
+        return format_duration(self.seconds)
+
+    @duration.setter
+    def duration(self, value):
+        if isinstance(value, int):
+            self.seconds = value
+        else:
+            self.seconds = parse_duration(value)
+
 class Playlist:
     def __init__(self, name):
         self.name = name
-        self.tracks = LinkedList()         
-        self.total_duration = "00:00"
+        self.tracks = LinkedList(indexed=True)         
+        self.total_seconds = 0      # running total, updated on every add and remove
+
+    @property
+    def total_duration(self):
+        return format_duration(self.total_seconds)
+
+    def own_tracks(self):
+        # copy-on-write: stop sharing the list with the queue before changing it
+        if self.tracks.shares > 0:
+            self.tracks.shares -= 1
+            self.tracks = self.tracks.copy()
+
+    def add_track(self, track):
+        self.own_tracks()
+        self.tracks.add(track)
+        self.total_seconds += track.seconds or 0
+
+    def add_tracks(self, tracks):
+        tracks = list(tracks)
+        self.own_tracks()
+        self.tracks.extend(tracks)
+        self.total_seconds += sum(track.seconds or 0 for track in tracks)
+        return len(tracks)
+
+    def remove_at(self, index):
+        self.own_tracks()
+        track = self.tracks.get(index)
+        if not self.tracks.remove_at(index):
+            return False
+        self.total_seconds -= track.seconds or 0
+        return True
 
 class MusicQueue:
     def __init__(self):
-        self.tracks = LinkedList()
+        self.tracks = LinkedList(indexed=True)
+        self.total_seconds = 0
         self.current_node = None
         self.repeat = False
         self.shuffle = False
-        self.original_order = LinkedList()
+        self.shuffle_order = []     # the queue's own nodes in shuffled order, tracks keeps the original order
+        self.shuffle_pos = 0        # index of current_node in shuffle_order (or shuffler.history)
+        self.shuffler = None        # LazyShuffle, used instead of shuffle_order for big queues
+
+    @property
+    def total_duration(self):
+        return format_duration(self.total_seconds)
+
+    def own_tracks(self):
+        # copy-on-write: a playlist loaded with load() is shared until the queue changes it
+        if self.tracks.shares == 0:
+            return
+
+        mapping = {}
+        copy = self.tracks.copy(mapping)
+        self.tracks.shares -= 1
+        self.tracks = copy
+        if self.current_node is not None:
+            self.current_node = mapping[self.current_node]
+        self.shuffle_order = [mapping[node] for node in self.shuffle_order]
+
+    def add_track(self, track):
+        self.append_tracks([track])
+
+
+
+    # LOAD A PLAYLIST
+    # O(1): the queue shares the playlist's list instead of copying it.
+    # -----------------------------------------------------------
+
+    def load(self, plist):
+        self.clear()
+        self.tracks = plist.tracks
+        self.tracks.shares += 1
+        self.total_seconds = plist.total_seconds
+        self.current_node = self.tracks.head
+
+
+
+    # APPEND / PLAY NEXT
+    # The new tracks are chained into their own list and spliced in, the rest of
+    # the queue is not rebuilt. While shuffled, new tracks always go to the end
+    # of tracks so queue positions stay stable, and are placed in the shuffle
+    # order instead.
+    # -----------------------------------------------------------
+
+    def append_tracks(self, tracks):
+        return self.insert_tracks(tracks, next_up=False)
+
+    def play_next(self, tracks):
+        return self.insert_tracks(tracks, next_up=True)
+
+    def insert_tracks(self, tracks, next_up):
+        new = LinkedList(indexed=True)
+        if new.extend(tracks) == 0:
+            return 0
+
+        nodes = list(new.nodes)
+        seconds = sum(node.data.seconds or 0 for node in nodes)
+        self.own_tracks()
+
+        if next_up and not self.shuffle:
+            self.tracks.splice_after(self.current_node, new)
+        else:
+            self.tracks.concat(new)
+        self.total_seconds += seconds
+
+        if self.shuffle:
+            self.shuffle_in(nodes, next_up)
+        if self.current_node is None:
+            self.current_node = self.tracks.head
+        return len(nodes)
+
+    def shuffle_in(self, nodes, next_up):
+        if self.shuffler is not None:
+            start = self.tracks.size - len(nodes)
+            self.shuffler.grow(len(nodes))
+            if next_up:
+                for i in range(len(nodes)):
+                    self.shuffler.take(start + i, at=self.shuffle_pos + 1 + i)
+        elif next_up:
+            at = self.shuffle_pos + 1
+            self.shuffle_order[at:at] = nodes
+        else:
+            nodes = nodes[:]
+            random.shuffle(nodes)
+            self.shuffle_order.extend(nodes)
+
+    # NAVIGATION
+    # next() and previous() move current_node and report what happened:
+    # "moved", "repeat" (wrapped to the start), "end", "start", or None when empty.
+    # -----------------------------------------------------------
+
+    def next(self):
+        if not self.current_node:
+            return None
+
+        if self.shuffle and self.shuffler is not None:
+            return self.next_lazy()
+
+        if self.shuffle:
+            order = self.shuffle_order
+            if self.shuffle_pos + 1 < len(order):
+                self.shuffle_pos += 1
+                status = "moved"
+            elif self.repeat:
+                self.shuffle_pos = 0
+                status = "repeat"
+            else:
+                status = "end"
+            self.current_node = order[self.shuffle_pos]
+            return status
+
+        if self.current_node.next:
+            self.current_node = self.current_node.next
+            return "moved"
+        elif self.repeat:
+            self.current_node = self.tracks.head
+            return "repeat"
+        return "end"
+
+    def previous(self):
+        if not self.current_node:
+            return None
+
+        if self.shuffle:
+            if self.shuffle_pos > 0:
+                self.shuffle_pos -= 1
+                self.current_node = self.shuffled_node(self.shuffle_pos)
+                return "moved"
+            return "start"
+
+        if self.current_node.prev:
+            self.current_node = self.current_node.prev
+            return "moved"
+        return "start"
+
+    def shuffled_node(self, index):
+        if self.shuffler is not None:
+            return self.tracks.node_at(self.shuffler.history[index])
+        return self.shuffle_order[index]
+
+    def next_lazy(self):
+        shuffler = self.shuffler
+        status = "moved"
+
+        # step forward through history first, draw a new track only at its end
+        if self.shuffle_pos + 1 >= len(shuffler.history):
+            if shuffler.draw() is None:
+                if not self.repeat:
+                    return "end"
+                shuffler.restart()
+                shuffler.draw()
+                status = "repeat"
+
+        self.shuffle_pos += 1
+        self.current_node = self.shuffled_node(self.shuffle_pos)
+        return status
+
+
+
+    # SHUFFLE
+    # tracks always keeps the original order, shuffling only builds a second
+    # order over the same nodes. Returns False when there is nothing to shuffle.
+    # -----------------------------------------------------------
+
+    def shuffle_on(self):
+        if self.tracks.size < 2:
+            return False
+
+        current = self.current_node or self.tracks.head
+
+        if self.tracks.size >= LAZY_SHUFFLE_SIZE:
+            # O(1): the permutation is produced one track at a time by next()
+            self.shuffler = LazyShuffle(self.tracks.size, first=self.tracks.position(current))
+            self.shuffle_order = []
+        else:
+            # shuffle references to the existing nodes, current track moves to the front
+            order = list(self.tracks.iter_nodes())
+            random.shuffle(order)
+            i = order.index(current)
+            order[0], order[i] = order[i], order[0]
+            self.shuffle_order = order
+            self.shuffler = None
+
+        self.shuffle_pos = 0
+        self.current_node = current
+        self.shuffle = True
+        return True
+
+    def shuffle_off(self):
+        if not self.shuffle:
+            return False
+
+        # the original order was never touched, carry on from the current node
+        self.shuffle_order = []
+        self.shuffler = None
+        self.shuffle_pos = 0
+        self.shuffle = False
+        return True
+
+    def clear(self):
+        if self.tracks.shares > 0:
+            # shared with a playlist, let go of it instead of emptying it
+            self.tracks.shares -= 1
+            self.tracks = LinkedList(indexed=True)
+        else:
+            self.tracks.clear()
+        self.total_seconds = 0
+        self.current_node = None
+        self.shuffle = False
+        self.shuffle_order = []
+        self.shuffle_pos = 0
+        self.shuffler = None
         
 class Album:
     def __init__(self, name):
         self.name = name
         self.tracks = LinkedList()
-
+        self.track_ids = set()     # ids already on the album, so a track is never filed twice
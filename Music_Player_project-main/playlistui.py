@@ -1,29 +1,24 @@
 import time
 from baseui import BaseUI
 from linkedlist import LinkedList
-from models import Playlist
+from models import Playlist, format_duration
 
 class PlaylistUI(BaseUI):
-    def __init__(self, playlists, library, queue=None):
+    def __init__(self, playlists, library, queue=None, library_ui=None):
         self.playlists = playlists    # LinkedList of Playlist objects
         self.library = library        # LinkedList of Track objects
         self.queue = queue            # MusicQueue object
+        self.library_ui = library_ui  # LibraryUI, for its album, artist and search indexes
 
     def calculate_duration(self, tracks_list):
         total_seconds = 0
         current = tracks_list.head
         while current:
-            try:
-                parts = current.data.duration.split(":")
-                minutes = int(parts[0])
-                seconds = int(parts[1])
-                total_seconds += (minutes * 60) + seconds
-            except:
-                pass # skip invalid durations
+            if current.data.seconds is not None:    # skip invalid durations
+                total_seconds += current.data.seconds
             current = current.next
         
-        m, s = divmod(total_seconds, 60)
-        return f"{m:02d}:{s:02d}"
+        return format_duration(total_seconds)
 
     def create_playlist(self):
         self.display_header("Create Playlist")
@@ -117,7 +112,9 @@ class PlaylistUI(BaseUI):
             print("\n1. Play Playlist (Load to Queue)")
             print("2. View/Remove Tracks")
             print("3. Add Track")
-            print("4. Back")
+            print("4. Append to Queue")
+            print("5. Play Next (after current track)")
+            print("6. Back")
 
             choice = input("Enter choice: ")
 
@@ -128,6 +125,10 @@ class PlaylistUI(BaseUI):
             elif choice == "3":
                 self.add_track_to_playlist(plist)
             elif choice == "4":
+                self.queue_playlist(plist, next_up=False)
+            elif choice == "5":
+                self.queue_playlist(plist, next_up=True)
+            elif choice == "6":
                 break
             else:
                 print("Invalid choice.")
@@ -141,25 +142,33 @@ class PlaylistUI(BaseUI):
             print("Playlist is empty.")
             return
 
-        # Clear queue and add all tracks
-        self.queue.tracks.clear()
-        self.queue.original_order.clear()
+        # Share the playlist's tracks with the queue, nothing is copied until one of them changes
+        self.queue.load(plist)
         self.queue.repeat = False
-        self.queue.shuffle = False
-        self.queue.current_node = None
-
-        current = plist.tracks.head
-        while current:
-            self.queue.tracks.add(current.data)
-            current = current.next
-        
-        # Set to start
-        self.queue.current_node = self.queue.tracks.head
         print(f"Loaded '{plist.name}' into queue! Go to Main Menu -> Play Queue to listen.")
 
+    def queue_playlist(self, plist, next_up):
+        if not self.queue:
+            print("Error: Queue system not connected (Check main.py).")
+            return
+
+        if plist.tracks.size == 0:
+            print("Playlist is empty.")
+            return
+
+        if next_up:
+            count = self.queue.play_next(plist.tracks.iter())
+            print(f"{count} track(s) from '{plist.name}' will play next.")
+        else:
+            count = self.queue.append_tracks(plist.tracks.iter())
+            print(f"Appended {count} track(s) from '{plist.name}' to the queue.")
+
     def add_track_to_playlist(self, plist):
-        # 1. Convert library to list for easy indexing
-        all_tracks = self.library.to_list()
+        # 1. Page over the sorted library view (no copy), or a plain list without one
+        if self.library_ui is not None:
+            all_tracks = self.library_ui.sorted_view.as_list()
+        else:
+            all_tracks = self.library.to_list()
         
         if not all_tracks:
             print("Library is empty. Go add tracks in the Main Menu first.")
@@ -182,6 +191,10 @@ class PlaylistUI(BaseUI):
 
             print("\nCOMMANDS:")
             print(" - Enter numbers to add (e.g., '1, 3, 5')")
+            if self.library_ui is not None:
+                print(" - [A] Add a whole album")
+                print(" - [R] Add every track by an artist")
+                print(" - [S] Add every result of a search")
             print(" - [N] Next Page")
             print(" - [P] Previous Page")
             print(" - [B] Back to Playlist")
@@ -200,6 +213,8 @@ class PlaylistUI(BaseUI):
                     page -= 1
                 else:
                     print("Already on first page.")
+            elif raw_input in ('a', 'r', 's') and self.library_ui is not None:
+                self.bulk_add(plist, raw_input)
             else:
                 # 3. Handle Number Input (e.g., "1,2")
                 try:
@@ -216,44 +231,87 @@ class PlaylistUI(BaseUI):
                         
                         if 0 <= idx < len(all_tracks):
                             track_to_add = all_tracks[idx]
-                            plist.tracks.add(track_to_add)
+                            plist.add_track(track_to_add)
                             added_count += 1
                         else:
                             print(f"Skipping invalid number: {choice}")
 
                     if added_count > 0:
                         print(f"Successfully added {added_count} track(s)!")
-                        # Recalculate duration immediately
-                        plist.total_duration = self.calculate_duration(plist.tracks)
                     else:
                         print("No valid tracks selected.")
 
                 except Exception as e:
                     print(f"Error: {e}")
 
+    def bulk_add(self, plist, mode):
+        if mode == 'a':
+            name = input("Album name: ").strip()
+            tracks = self.library_ui.tracks_on_album(name)
+        elif mode == 'r':
+            name = input("Artist name: ").strip()
+            tracks = self.library_ui.tracks_by_artist(name)
+        else:
+            name = input("Search: ").strip()
+            tracks = self.library_ui.search_index.search(name) if name else []
+
+        if not tracks:
+            print(f"No tracks found for '{name}'.")
+            return
+
+        # one splice and one duration update for the whole batch
+        added_count = plist.add_tracks(tracks)
+        print(f"Successfully added {added_count} track(s)!")
+
     def manage_tracks(self, plist):
         if plist.tracks.size == 0:
             print("No tracks to manage.")
             return
 
+        page = 1
+        page_size = 10
+
         while True:
-            tracks_list = plist.tracks.to_list()
-            self.display_header(f"Tracks in {plist.name}")
-            
-            for i, track in enumerate(tracks_list):
-                print(f"[{i+1}] {track.title} - {track.duration}")
+            self.display_header(f"Tracks in {plist.name} (Page {page})")
+
+            start = (page - 1) * page_size
+            first = plist.tracks.node_at(start)
+            if first is None:
+                page = max(1, (plist.tracks.size + page_size - 1) // page_size)
+                continue
+
+            index = start
+            node = first
+            while node is not None and index < start + page_size:
+                print(f"[{index + 1}] {node.data.title} - {node.data.duration}")
+                node = node.next
+                index += 1
 
-            print("\nEnter number to remove, or 'B' to back.")
+            print("\nEnter number to remove, [N] Next Page, [P] Previous Page, or 'B' to back.")
             choice = input("Choice: ").strip().lower()
 
             if choice == 'b':
                 break
+            elif choice == 'n':
+                if page * page_size < plist.tracks.size:
+                    page += 1
+                else:
+                    print("No more pages.")
+                continue
+            elif choice == 'p':
+                if page > 1:
+                    page -= 1
+                else:
+                    print("Already on first page.")
+                continue
             
             try:
                 idx = int(choice) - 1
-                if plist.tracks.remove_at(idx):
+                if plist.remove_at(idx):
                     print("Track removed.")
-                    plist.total_duration = self.calculate_duration(plist.tracks)
+                    if plist.tracks.size == 0:
+                        print("No tracks left in playlist.")
+                        break
                 else:
                     print("Invalid index.")
             except ValueError:
@@ -0,0 +1,123 @@
+import atexit
+import sys
+import time
+from functools import wraps
+
+from library import LibraryUI
+from playlistui import PlaylistUI
+from models import Playlist, MusicQueue
+from searchindex import SearchIndex
+from sortedview import SortedView
+
+PROFILE_ENV = "MUSIC_PLAYER_PROFILE"     # "summary", or a file name for cProfile output as well
+BLOCKS_ENV = "MUSIC_PLAYER_PROFILE_BLOCKS"    # set to count allocated memory blocks too
+
+# Methods that are timed. Interactive ones (search_track, import_tracks...)
+# include the time spent waiting for input, the ones they call do not.
+TARGETS = (
+    (LibraryUI, ("add_track", "search_track", "show_library", "import_tracks", "import_file",
+                 "register_track", "store_track", "journal_track", "add_to_album",
+                 "remove_from_album", "update_track", "merge_track",
+                 "save_library", "load_library", "load_snapshot")),
+    (PlaylistUI, ("calculate_duration", "play_playlist", "queue_playlist", "bulk_add")),
+    (Playlist, ("add_track", "add_tracks", "remove_at")),
+    (MusicQueue, ("load", "append_tracks", "play_next", "next", "previous",
+                  "shuffle_on", "shuffle_off", "clear")),
+    (SearchIndex, ("search", "fuzzy_search")),
+    (SortedView, ("flush",)),
+)
+
+
+# CALL STATISTICS
+# name -> [calls, seconds, blocks]. blocks is the change in allocated memory
+# blocks across the call, what a call left allocated rather than every
+# allocation. It is only taken when asked for: sys.getallocatedblocks walks
+# every arena, so on a large library it costs more than the calls it measures
+# and the time of the nested calls lands in their callers' totals.
+# -----------------------------------------------------------
+
+stats = {}
+installed = []
+counting_blocks = False
+
+
+def instrument(cls, name, count_blocks):
+    method = getattr(cls, name)
+    key = f"{cls.__name__}.{name}"
+    entry = stats.setdefault(key, [0, 0.0, 0])
+    clock = time.perf_counter
+    blocks = sys.getallocatedblocks
+
+    if count_blocks:
+        @wraps(method)
+        def timed(*args, **kwargs):
+            before = blocks()
+            started = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                entry[1] += clock() - started
+                entry[2] += blocks() - before
+                entry[0] += 1
+    else:
+        @wraps(method)
+        def timed(*args, **kwargs):
+            started = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                entry[1] += clock() - started
+                entry[0] += 1
+
+    setattr(cls, name, timed)
+    installed.append((cls, name, method))
+
+
+def enable(mode="summary", count_blocks=False):
+    global counting_blocks
+    if installed:
+        return
+
+    counting_blocks = count_blocks
+    for cls, names in TARGETS:
+        for name in names:
+            instrument(cls, name, count_blocks)
+
+    profile = None
+    if mode and mode != "summary":
+        import cProfile
+        profile = cProfile.Profile()
+        profile.enable()
+
+    def finish():
+        if profile is not None:
+            profile.disable()
+            profile.dump_stats(mode)
+            print(f"cProfile stats written to {mode}", file=sys.stderr)
+        print(summary(), file=sys.stderr)
+
+    atexit.register(finish)
+
+
+def disable():
+    while installed:
+        cls, name, method = installed.pop()
+        setattr(cls, name, method)
+
+
+
+# SUMMARY
+# Slowest first by total time, operations that never ran are left out.
+# -----------------------------------------------------------
+
+def summary():
+    header = f"{'operation':32} {'calls':>8} {'total ms':>11} {'avg us':>10}"
+    lines = ["\n--- PROFILE ---", header + (f" {'blocks':>9}" if counting_blocks else "")]
+    for key, (calls, seconds, blocks) in sorted(stats.items(), key=lambda item: -item[1][1]):
+        if calls == 0:
+            continue
+        line = f"{key:32} {calls:8d} {seconds * 1000:11.2f} {seconds / calls * 1e6:10.1f}"
+        if counting_blocks:
+            line += f" {blocks:9d}"
+        lines.append(line)
+    return "\n".join(lines)
@@ -1,7 +1,5 @@
 # queueui.py
-import random
 from baseui import BaseUI
-from linkedlist import LinkedList
 
 class QueueUI(BaseUI):
     def __init__(self, queue):
@@ -35,6 +33,7 @@ class QueueUI(BaseUI):
             else: status.append("Repeat: OFF")
             
             print(f"\nSTATUS: {' | '.join(status)}")
+            print(f"QUEUE:  {self.queue.tracks.size} tracks, {self.queue.total_duration}")
             
             print("\n[P] Play/Pause (Simulated)")
             print("[N] Next Track")
@@ -71,55 +70,25 @@ class QueueUI(BaseUI):
                 print("Invalid key.")
 
     def next_track(self):
-        if not self.queue.current_node:
-            return
-
-        if self.queue.current_node.next:
-            self.queue.current_node = self.queue.current_node.next
-        elif self.queue.repeat:
+        status = self.queue.next()
+        if status == "repeat":
             print("Repeating queue...")
-            self.queue.current_node = self.queue.tracks.head
-        else:
+        elif status == "end":
             print("End of queue.")
 
     def previous_track(self):
-        if not self.queue.current_node:
-            return
-
-        if self.queue.current_node.prev:
-            self.queue.current_node = self.queue.current_node.prev
-        else:
+        if self.queue.previous() == "start":
             print("Start of queue.")
 
     def shuffle_on(self):
-        if self.queue.tracks.size < 2:
+        if self.queue.shuffle_on():
+            print("Shuffle ON.")
+        else:
             print("Not enough tracks to shuffle.")
-            return
-
-        # 1. Save original order
-        self.queue.original_order.from_list(self.queue.tracks.to_list())
-        
-        # 2. Shuffle
-        items = self.queue.tracks.to_list()
-        random.shuffle(items)
-        
-        # 3. Rebuild queue
-        self.queue.tracks.from_list(items)
-        self.queue.current_node = self.queue.tracks.head
-        self.queue.shuffle = True
-        print("Shuffle ON.")
 
     def shuffle_off(self):
-        if not self.queue.shuffle:
-            return
-
-        # Restore original order
-        self.queue.tracks.from_list(self.queue.original_order.to_list())
-        self.queue.original_order.clear()
-        
-        self.queue.current_node = self.queue.tracks.head
-        self.queue.shuffle = False
-        print("Shuffle OFF.")
+        if self.queue.shuffle_off():
+            print("Shuffle OFF.")
 
     def repeat_on(self):
         self.queue.repeat = True
@@ -130,9 +99,6 @@ class QueueUI(BaseUI):
         print("Repeat OFF.")
 
     def clear_queue(self):
-        self.queue.tracks.clear()
-        self.queue.original_order.clear()
-        self.queue.current_node = None
-        self.queue.shuffle = False
+        self.queue.clear()
         self.queue.repeat = False
         print("Queue cleared.")
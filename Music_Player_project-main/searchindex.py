@@ -0,0 +1,270 @@
+import re
+from array import array
+from bisect import bisect_left
+
+WORD = re.compile(r"\w+")
+MAX_ID = (1 << 32) - 1     # postings hold ids as unsigned 32 bit numbers
+
+
+def normalise(text):
+    return " ".join(text.casefold().split())
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def word_trigrams(word):
+    # padded so short words and word starts still produce grams
+    return trigrams(f"  {word} ")
+
+
+
+# EDIT DISTANCE
+# Levenshtein distance, giving up as soon as it must exceed limit
+# (then limit + 1 is returned).
+# -----------------------------------------------------------
+
+def edit_distance(a, b, limit):
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1,
+                               current[j - 1] + 1,
+                               previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(previous[-1], limit + 1)
+
+
+# POSTINGS
+# A posting list is an array of track ids kept in ascending order: 4 bytes a
+# track instead of a hash set entry per track and a set object per key, and
+# membership is a binary search.
+# -----------------------------------------------------------
+
+def insert_id(postings, item):
+    if not postings or postings[-1] < item:
+        postings.append(item)      # ids are handed out in increasing order, the usual case
+    else:
+        i = bisect_left(postings, item)
+        if i == len(postings) or postings[i] != item:
+            postings.insert(i, item)
+
+
+def discard_id(postings, item):
+    i = bisect_left(postings, item)
+    if i < len(postings) and postings[i] == item:
+        del postings[i]
+
+
+def contains_id(postings, item):
+    i = bisect_left(postings, item)
+    return i < len(postings) and postings[i] == item
+
+
+
+class SearchIndex:
+    def __init__(self):
+        self.tracks = {}     # track id -> track
+        self.fields = {}     # track id -> normalised title, artists and album
+        self.exact = {}      # whole normalised field -> postings
+        self.words = {}      # whole word -> postings
+        self.prefixes = {}   # first one or two letters of a word -> set of distinct words
+        self.grams = {}      # three character slice of a field -> postings
+        self.word_grams = {} # trigram -> set of distinct words, for typo tolerant search
+
+
+
+    # ADD A TRACK TO THE INDEX
+    # Adding and removing a track only touches its own keys. Short prefixes
+    # lead to words rather than tracks, so "a" is not a posting of most of
+    # the library.
+    # -----------------------------------------------------------
+
+    def add(self, track):
+        if track.id in self.fields:
+            return
+
+        fields = [normalise(track.title), normalise(track.artist), normalise(track.album)]
+        for name in track.adds.iter():
+            fields.append(normalise(name))
+        fields = tuple(field for field in fields if field)
+
+        self.tracks[track.id] = track
+        self.fields[track.id] = fields
+
+        for table, key in self.keys(fields):
+            postings = table.get(key)
+            if postings is None:
+                postings = table[key] = array("I")
+                if table is self.words:
+                    self.learn_word(key)
+            insert_id(postings, track.id)
+
+    def learn_word(self, word):
+        for gram in word_trigrams(word):
+            self.word_grams.setdefault(gram, set()).add(word)
+        for prefix in {word[:1], word[:2]}:
+            self.prefixes.setdefault(prefix, set()).add(word)
+
+
+
+    # REMOVE A TRACK FROM THE INDEX
+    # -----------------------------------------------------------
+
+    def remove(self, track):
+        fields = self.fields.pop(track.id, None)
+        if fields is None:
+            return
+        del self.tracks[track.id]
+
+        for table, key in self.keys(fields):
+            postings = table.get(key)
+            if postings is None:
+                continue
+            discard_id(postings, track.id)
+            if not postings:
+                del table[key]
+                if table is self.words:
+                    self.forget_word(key)
+
+    def forget_word(self, word):
+        for table, keys in ((self.word_grams, word_trigrams(word)),
+                            (self.prefixes, {word[:1], word[:2]})):
+            for key in keys:
+                words = table.get(key)
+                if words is not None:
+                    words.discard(word)
+                    if not words:
+                        del table[key]
+
+    def clear(self):
+        self.tracks.clear()
+        self.fields.clear()
+        self.exact.clear()
+        self.words.clear()
+        self.prefixes.clear()
+        self.grams.clear()
+        self.word_grams.clear()
+
+    def keys(self, fields):
+        exact = set(fields)
+        words = set()
+        grams = set()
+        for field in fields:
+            words.update(WORD.findall(field))
+            grams.update(trigrams(field))
+
+        keys = []
+        for table, found in ((self.exact, exact), (self.words, words), (self.grams, grams)):
+            for key in found:
+                keys.append((table, key))
+        return keys
+
+
+
+    # SEARCH
+    # Returns exact field matches, then whole word matches, then partial matches,
+    # each in track id (library) order.
+    # Only the postings for the query are read, never the whole library.
+    # -----------------------------------------------------------
+
+    def search(self, query):
+        query = normalise(query)
+        if not query:
+            return []
+
+        if len(query) < 3:
+            candidates = set()
+            for word in self.prefixes.get(query, ()):
+                candidates.update(self.words[word])
+        else:
+            postings = [self.grams.get(gram) for gram in trigrams(query)]
+            if any(p is None for p in postings):
+                return []
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for other in postings[1:]:
+                if len(other) > 8 * len(candidates):
+                    candidates = {item for item in candidates if contains_id(other, item)}
+                else:
+                    candidates.intersection_update(other)
+
+        exact = self.exact.get(query, ())
+        query_words = WORD.findall(query)
+        whole = []
+        partial = []
+
+        for item in candidates:
+            if contains_id(exact, item):
+                continue
+            if query_words and all(contains_id(self.words.get(w, ()), item) for w in query_words):
+                whole.append(item)
+            elif len(query) < 3 or any(query in field for field in self.fields[item]):
+                partial.append(item)
+
+        tracks = self.tracks
+        ranked = [tracks[item] for item in exact]
+        ranked += [tracks[item] for item in sorted(whole)]
+        ranked += [tracks[item] for item in sorted(partial)]
+        return ranked
+
+
+
+    # FUZZY SEARCH
+    # Each query word is matched against the vocabulary (distinct words), not
+    # against tracks: words sharing the most trigrams are the only ones an edit
+    # distance is computed for. Tracks must contain a close word for every query
+    # word and are ranked by the total distance.
+    # -----------------------------------------------------------
+
+    def similar_words(self, word, candidates=50):
+        limit = 1 if len(word) <= 4 else 2
+        grams = word_trigrams(word)
+
+        shared = {}
+        for gram in grams:
+            for other in self.word_grams.get(gram, ()):
+                shared[other] = shared.get(other, 0) + 1
+
+        # at least a third of the query's grams in common, best overlaps first
+        needed = max(1, len(grams) // 3)
+        ranked = sorted((item for item in shared.items() if item[1] >= needed),
+                        key=lambda item: -item[1])[:candidates]
+
+        matches = {}
+        for other, _ in ranked:
+            distance = edit_distance(word, other, limit)
+            if distance <= limit:
+                matches[other] = distance
+        return matches
+
+    def fuzzy_search(self, query, limit=100):
+        query_words = WORD.findall(normalise(query))
+        if not query_words:
+            return []
+
+        scores = None
+        for word in query_words:
+            best = {}
+            for other, distance in self.similar_words(word).items():
+                for item in self.words.get(other, ()):
+                    if distance < best.get(item, distance + 1):
+                        best[item] = distance
+
+            if scores is None:
+                scores = best
+            else:
+                scores = {item: scores[item] + best[item] for item in scores if item in best}
+            if not scores:
+                return []
+
+        ranked = sorted(scores, key=lambda item: (scores[item], item))
+        return [self.tracks[item] for item in ranked[:limit]]
+
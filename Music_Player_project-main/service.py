@@ -0,0 +1,310 @@
+import inspect
+from itertools import islice
+
+from models import Track, Playlist, MusicQueue, format_duration
+from linkedlist import LinkedList
+from library import LibraryUI
+from importer import split_artists, parse_seconds
+from session import save_session, load_session, SESSION_FILE
+
+# Every command a script may run, see PlayerService.execute
+COMMANDS = (
+    "add_track", "import_file", "list_library", "search", "artist",
+    "list_playlists", "create_playlist", "playlist", "playlist_add", "playlist_remove",
+    "play_playlist", "queue_playlist", "queue_state", "now_playing",
+    "next", "previous", "shuffle", "repeat", "clear_queue", "save"
+)
+
+
+# ARGUMENT CHECKS
+# Commands come from JSON, so every argument is checked for its type before
+# anything is changed; a wrong type is a ValueError like any other bad input.
+# -----------------------------------------------------------
+
+def text(value, name):
+    if not isinstance(value, str):
+        raise ValueError(f"{name} must be a string")
+    return value.strip()
+
+
+def whole(value, name):
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise ValueError(f"{name} must be a whole number")
+    return value
+
+
+def flag(value, name):
+    if not isinstance(value, bool):
+        raise ValueError(f"{name} must be true or false")
+    return value
+
+
+
+# PLAYER SERVICE
+# The same library, playlists and queue the menus use, driven by plain method
+# calls. Nothing here reads input or prints; every command returns data
+# (dicts and lists of plain values) and bad arguments raise ValueError.
+# -----------------------------------------------------------
+
+class PlayerService:
+    def __init__(self, load=True, session_file=SESSION_FILE, journal=True, writer=None):
+        self.library = LinkedList()      # LinkedList of Track objects
+        self.playlists = LinkedList()    # LinkedList of Playlist objects
+        self.queue = MusicQueue()
+        self.albums = LinkedList()
+        self.tracks_by_id = {}           # track id -> Track
+        self.session_file = session_file
+        self.journal = journal           # False: added tracks are only written by save()
+
+        # LibraryUI owns the indexes and the files, only its non-interactive methods are used here
+        self.engine = LibraryUI(self.library, self.playlists, self.albums, self.tracks_by_id, writer)
+
+        if load:
+            self.load()
+
+    def load(self):
+        self.engine.load_library()
+        load_session(self.tracks_by_id, self.playlists, self.queue, self.session_file)
+
+    def execute(self, command, args=None):
+        if not isinstance(command, str) or command not in COMMANDS:
+            raise ValueError(f"Unknown command '{command}'")
+        if args is None:
+            args = {}
+        if not isinstance(args, dict):
+            raise ValueError("args must be an object")
+
+        # missing or unknown argument names are caught before the command runs
+        method = getattr(self, command)
+        try:
+            inspect.signature(method).bind(**args)
+        except TypeError as e:
+            raise ValueError(f"Bad arguments for '{command}': {e}")
+        return method(**args)
+
+
+
+    # RESULTS
+    # -----------------------------------------------------------
+
+    def track_info(self, track):
+        return self.engine.track_record(track)
+
+    def track_list(self, tracks):
+        return [self.engine.track_record(track) for track in tracks]
+
+    def playlist_info(self, plist):
+        return {"name": plist.name, "tracks": plist.tracks.size, "duration": plist.total_duration}
+
+    def find_playlist(self, name):
+        key = text(name, "name").casefold()
+        for plist in self.playlists.iter():
+            if plist.name.casefold() == key:
+                return plist
+        raise ValueError(f"No playlist named '{name}'")
+
+    def find_track(self, track_id):
+        track = self.tracks_by_id.get(track_id)
+        if track is None:
+            raise ValueError(f"No track with id {track_id}")
+        return track
+
+
+
+    # LIBRARY
+    # -----------------------------------------------------------
+
+    def add_track(self, title, artist, album, duration, additional_artists=()):
+        self.engine.check_writable()
+        title = text(title, "title")
+        artist = text(artist, "artist")
+        album = text(album, "album")
+        if not isinstance(additional_artists, str):
+            if not isinstance(additional_artists, (list, tuple)):
+                raise ValueError("additional_artists must be a string or a list of strings")
+            for name in additional_artists:
+                text(name, "additional_artists")
+        if not title or not artist:
+            raise ValueError("Title and artist are required")
+
+        seconds = parse_seconds(duration)
+        if seconds is None:
+            raise ValueError("Duration must be mm:ss with seconds below 60")
+
+        adds = LinkedList()
+        adds.extend(split_artists(additional_artists))
+
+        track = Track(title, artist, adds, album, format_duration(seconds))
+        if self.journal:
+            self.engine.store_track(track)
+        else:
+            self.engine.register_track(track)
+        return self.track_info(track)
+
+    def import_file(self, filename, policy="s"):
+        return self.engine.import_file(text(filename, "filename"), text(policy, "policy").lower())
+
+    def list_library(self, start=0, count=10):
+        start = whole(start, "start")
+        count = whole(count, "count")
+        view = self.engine.sorted_view
+        return {"total": len(view),
+                "tracks": self.track_list(islice(view.iter_from(max(0, start)), count))}
+
+    def search(self, query, fuzzy=True):
+        query = text(query, "query")
+        fuzzy = flag(fuzzy, "fuzzy")
+        if not query:
+            raise ValueError("Empty search")
+
+        results = self.engine.search_index.search(query)
+        used_fuzzy = False
+        if not results and fuzzy:
+            results = self.engine.search_index.fuzzy_search(query)
+            used_fuzzy = True
+        return {"fuzzy": used_fuzzy, "tracks": self.track_list(results)}
+
+    def artist(self, name):
+        name = text(name, "name")
+        index = self.engine.artist_index
+        return {"name": index.display_name(name),
+                "tracks": self.track_list(index.tracks_by(name)),
+                "featured": self.track_list(index.featuring(name))}
+
+
+
+    # PLAYLISTS
+    # -----------------------------------------------------------
+
+    def list_playlists(self):
+        return [self.playlist_info(plist) for plist in self.playlists.iter()]
+
+    def create_playlist(self, name):
+        name = text(name, "name")
+        if not name:
+            raise ValueError("Name cannot be empty")
+        for plist in self.playlists.iter():
+            if plist.name.casefold() == name.casefold():
+                raise ValueError("A playlist with this name already exists")
+
+        plist = Playlist(name)
+        self.playlists.add(plist)
+        return self.playlist_info(plist)
+
+    def playlist(self, name):
+        plist = self.find_playlist(name)
+        info = self.playlist_info(plist)
+        info["tracks"] = self.track_list(plist.tracks.iter())
+        return info
+
+    def playlist_add(self, name, ids=(), album=None, artist=None, search=None):
+        plist = self.find_playlist(name)
+        if not isinstance(ids, (list, tuple)):
+            raise ValueError("ids must be a list of track ids")
+
+        tracks = [self.find_track(whole(track_id, "ids")) for track_id in ids]
+        if album is not None:
+            tracks += self.engine.tracks_on_album(text(album, "album"))
+        if artist is not None:
+            tracks += self.engine.tracks_by_artist(text(artist, "artist"))
+        if search is not None and text(search, "search"):
+            tracks += self.engine.search_index.search(search)
+
+        added = plist.add_tracks(tracks)
+        return {"added": added, "playlist": self.playlist_info(plist)}
+
+    def playlist_remove(self, name, index):
+        index = whole(index, "index")
+        plist = self.find_playlist(name)
+        if not plist.remove_at(index):
+            raise ValueError(f"No track at index {index}")
+        return self.playlist_info(plist)
+
+
+
+    # QUEUE
+    # -----------------------------------------------------------
+
+    def queue_state(self, start=0, count=10):
+        start = whole(start, "start")
+        count = whole(count, "count")
+        queue = self.queue
+        current = -1
+        if queue.current_node is not None:
+            current = queue.tracks.position(queue.current_node)
+
+        tracks = []
+        node = queue.tracks.node_at(max(0, start))
+        while node is not None and len(tracks) < count:
+            tracks.append(self.track_info(node.data))
+            node = node.next
+
+        return {"size": queue.tracks.size, "duration": queue.total_duration,
+                "current": current, "shuffle": queue.shuffle, "repeat": queue.repeat,
+                "tracks": tracks}
+
+    def now_playing(self):
+        if self.queue.current_node is None:
+            self.queue.current_node = self.queue.tracks.head
+        if self.queue.current_node is None:
+            return None
+        return self.track_info(self.queue.current_node.data)
+
+    def play_playlist(self, name):
+        plist = self.find_playlist(name)
+        if plist.tracks.size == 0:
+            raise ValueError("Playlist is empty")
+        self.queue.load(plist)
+        self.queue.repeat = False
+        return self.now_playing()
+
+    def queue_playlist(self, name, next_up=False):
+        next_up = flag(next_up, "next_up")
+        plist = self.find_playlist(name)
+        if next_up:
+            count = self.queue.play_next(plist.tracks.iter())
+        else:
+            count = self.queue.append_tracks(plist.tracks.iter())
+        return {"added": count, "size": self.queue.tracks.size}
+
+    def next(self):
+        if self.queue.current_node is None:
+            self.queue.current_node = self.queue.tracks.head
+        status = self.queue.next()
+        return {"status": status, "track": self.now_playing()}
+
+    def previous(self):
+        if self.queue.current_node is None:
+            self.queue.current_node = self.queue.tracks.head
+        status = self.queue.previous()
+        return {"status": status, "track": self.now_playing()}
+
+    def shuffle(self, on=True):
+        if flag(on, "on"):
+            if not self.queue.shuffle_on():
+                raise ValueError("Not enough tracks to shuffle")
+        else:
+            self.queue.shuffle_off()
+        return {"shuffle": self.queue.shuffle}
+
+    def repeat(self, on=True):
+        self.queue.repeat = flag(on, "on")
+        return {"repeat": self.queue.repeat}
+
+    def clear_queue(self):
+        self.queue.clear()
+        self.queue.repeat = False
+        return {"size": 0}
+
+
+
+    # SAVE
+    # Library and session together, the menus save the same two files.
+    # -----------------------------------------------------------
+
+    def save(self):
+        if self.engine.read_only:
+            raise ValueError("The library could not be loaded, nothing was saved")
+        self.engine.save_library()
+        save_session(self.playlists, self.queue, self.session_file)
+        return {"tracks": self.library.size, "playlists": self.playlists.size}
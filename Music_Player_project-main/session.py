@@ -0,0 +1,136 @@
+import json
+
+from journal import write_json
+from models import Playlist
+from shuffle import LazyShuffle
+
+SESSION_FILE = "session.json"
+
+# Playlists and the queue are saved as track ids instead of copies of the
+# track data, so the file stays small and nothing is duplicated.
+
+
+
+# SAVE PLAYLISTS AND QUEUE
+# -----------------------------------------------------------
+
+def save_session(playlists, queue, filename=SESSION_FILE):
+    write_json(filename, session_data(playlists, queue))
+
+
+def session_data(playlists, queue):
+    def refs(tracks):
+        return [track.id for track in tracks.iter()]
+
+    data = {"playlists": [], "queue": None}
+
+    node = playlists.head
+    while node is not None:
+        plist = node.data
+        data["playlists"].append({"name": plist.name, "tracks": refs(plist.tracks)})
+        node = node.next
+
+    current = -1
+    if queue.current_node is not None:
+        current = queue.tracks.position(queue.current_node)
+
+    data["queue"] = {
+        "tracks": refs(queue.tracks),
+        "shuffle_order": [queue.tracks.position(node) for node in queue.shuffle_order],
+        "shuffle_pos": queue.shuffle_pos,
+        "lazy_shuffle": queue.shuffler.to_dict() if queue.shuffler is not None else None,
+        "current": current,
+        "shuffle": queue.shuffle,
+        "repeat": queue.repeat
+    }
+    return data
+
+
+
+# RESTORE PLAYLISTS AND QUEUE
+# Every id is resolved through the library's id -> Track index, no scans.
+# Ids of tracks that no longer exist are dropped. The whole file is checked
+# before anything is restored; a damaged session is ignored (False) rather
+# than stopping the library from loading.
+# -----------------------------------------------------------
+
+def field(data, name, kind, default):
+    value = data.get(name, default)
+    if value is default:
+        return value
+    if not isinstance(value, kind) or (kind is int and isinstance(value, bool)):
+        raise ValueError(f"'{name}' has the wrong type")
+    return value
+
+
+def numbers(values):
+    if not all(isinstance(value, int) and not isinstance(value, bool) for value in values):
+        raise ValueError("expected whole numbers")
+    return values
+
+
+def read_session(data, tracks_by_id):
+    def resolve(refs):
+        return [tracks_by_id[ref] for ref in numbers(refs) if ref in tracks_by_id]
+
+    if not isinstance(data, dict):
+        raise ValueError("not a session")
+
+    playlists = []
+    for item in field(data, "playlists", list, []):
+        if not isinstance(item, dict) or not isinstance(item.get("name"), str):
+            raise ValueError("playlist without a name")
+        playlists.append((item["name"], resolve(field(item, "tracks", list, []))))
+
+    saved = field(data, "queue", dict, None) or {}
+    lazy = field(saved, "lazy_shuffle", dict, None)
+    return {
+        "playlists": playlists,
+        "tracks": resolve(field(saved, "tracks", list, [])),
+        "current": field(saved, "current", int, -1),
+        "repeat": field(saved, "repeat", bool, False),
+        "shuffle": field(saved, "shuffle", bool, False),
+        "shuffle_order": numbers(field(saved, "shuffle_order", list, [])),
+        "shuffle_pos": field(saved, "shuffle_pos", int, 0),
+        "lazy_shuffle": LazyShuffle.from_dict(lazy) if lazy is not None else None
+    }
+
+
+def load_session(tracks_by_id, playlists, queue, filename=SESSION_FILE):
+    try:
+        with open(filename, "r") as file:
+            data = json.load(file)
+        state = read_session(data, tracks_by_id)
+    except (OSError, ValueError, TypeError, KeyError, OverflowError):
+        return False
+
+    playlists.clear()
+    for name, tracks in state["playlists"]:
+        plist = Playlist(name)
+        plist.add_tracks(tracks)
+        playlists.add(plist)
+
+    queue.clear()
+    queue.append_tracks(state["tracks"])
+    queue.current_node = queue.tracks.node_at(state["current"])
+    queue.repeat = state["repeat"]
+
+    # shuffle order is stored as queue positions of the same nodes
+    order = [queue.tracks.node_at(i) for i in state["shuffle_order"]]
+    lazy = state["lazy_shuffle"]
+    pos = state["shuffle_pos"]
+    queue.shuffler = None
+    if lazy is not None and lazy.size == queue.tracks.size:
+        queue.shuffler = lazy
+        order = []
+        if not 0 <= pos < max(1, len(lazy.history)):
+            queue.shuffler = order = None
+    elif len(order) != queue.tracks.size or None in order or not 0 <= pos < max(1, len(order)):
+        order = None
+
+    queue.shuffle = state["shuffle"] and order is not None
+    queue.shuffle_order = order if queue.shuffle else []
+    queue.shuffle_pos = pos if queue.shuffle else 0
+    if not queue.shuffle:
+        queue.shuffler = None
+    return True
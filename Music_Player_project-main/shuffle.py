@@ -0,0 +1,88 @@
+import random
+
+
+# LAZY SHUFFLE
+# Fisher-Yates over queue positions 0..size-1, run one step at a time. Only the
+# slots disturbed so far are stored (swaps), so starting a shuffle is O(1) and
+# memory grows with the number of tracks played, not with the queue size.
+# history records every position handed out, for exact back navigation.
+# -----------------------------------------------------------
+
+class LazyShuffle:
+    def __init__(self, size, first=None, seed=None):
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.size = size
+        self.swaps = {}       # slot -> position moved into it, slots not in here hold themselves
+        self.drawn = 0        # slots before this one are already used in the current round
+        self.history = []     # positions in the order they were played, across rounds
+
+        if first is not None:
+            self.take(first)
+
+    def slot(self, index):
+        return self.swaps.get(index, index)
+
+    def take(self, position, at=None):
+        # play a chosen position next: the track playing when shuffle started, or one
+        # just appended by play next. Only valid for positions nothing was swapped into.
+        self.swaps[position] = self.slot(self.drawn)
+        self.swaps.pop(self.drawn, None)
+        self.drawn += 1
+        if at is None:
+            self.history.append(position)
+        else:
+            self.history.insert(at, position)
+
+    def draw(self):
+        if self.drawn >= self.size:
+            return None
+
+        j = self.rng.randrange(self.drawn, self.size)
+        position = self.slot(j)
+        self.swaps[j] = self.slot(self.drawn)
+        self.swaps.pop(self.drawn, None)
+        self.drawn += 1
+        self.history.append(position)
+        return position
+
+    def restart(self):
+        # new round for repeat, history is kept so previous still works
+        self.swaps = {}
+        self.drawn = 0
+
+    def grow(self, count):
+        # tracks appended to the queue join the positions not drawn yet
+        self.size += count
+
+    def to_dict(self):
+        version, internal, gauss = self.rng.getstate()
+        return {
+            "size": self.size,
+            "drawn": self.drawn,
+            "swaps": [[k, v] for k, v in self.swaps.items()],
+            "history": self.history,
+            "state": [version, list(internal), gauss]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        # raises ValueError, TypeError, KeyError or OverflowError for anything to_dict could not have written
+        size = data["size"]
+        shuffle = cls(size, seed=0)
+        shuffle.drawn = data["drawn"]
+        shuffle.swaps = {k: v for k, v in data["swaps"]}
+        shuffle.history = list(data["history"])
+
+        def position(value, end=size - 1):
+            return type(value) is int and 0 <= value <= end
+
+        if not (position(size, size) and position(shuffle.drawn, size)
+                and all(position(k) and position(v) for k, v in shuffle.swaps.items())
+                and all(position(p) for p in shuffle.history)):
+            raise ValueError("Shuffle state does not fit the queue")
+        version, internal, gauss = data["state"]
+        shuffle.rng.setstate((version, tuple(internal), gauss))
+        return shuffle
@@ -0,0 +1,148 @@
+import mmap
+import struct
+
+from linkedlist import LinkedList
+from models import Track, NO_ADDS
+from journal import write_atomic
+
+# FILE LAYOUT (all little endian)
+#   header      magic, version, track count, string count, offsets of the sections below
+#   offsets     string count + 1 uint64 byte offsets into the string data
+#   strings     utf-8 bytes of every distinct title, artist and album name
+#   records     one fixed width record per track
+#   adds        uint32 string ids of additional artists, referenced from the records
+# -----------------------------------------------------------
+
+MAGIC = b"MPSN"
+VERSION = 2
+HEADER = struct.Struct("<4sHxxIIQQQ")     # magic, version, tracks, strings, offsets at, records at, adds at
+RECORD = struct.Struct("<QIIIIIi")         # id, title, artist, album, first add, add count, seconds (-1 = invalid)
+OFFSET = struct.Struct("<Q")
+STRING_ID = struct.Struct("<I")
+
+
+
+# WRITE A SNAPSHOT
+# Every distinct string is stored once, so repeated artists and albums cost 4 bytes per track.
+# -----------------------------------------------------------
+
+def write_snapshot(filename, tracks):
+    write_atomic(filename, pack_snapshot(tracks))
+
+
+def pack_snapshot(tracks):
+    # builds the whole file in memory from (id, title, artist, additional artists,
+    # album, seconds) rows, see LibraryUI.library_rows
+    ids = {}
+    strings = []
+
+    def string_id(text):
+        found = ids.get(text)
+        if found is None:
+            found = len(strings)
+            ids[text] = found
+            strings.append(text.encode("utf-8"))
+        return found
+
+    records = bytearray()
+    adds = bytearray()
+    add_count = 0
+    count = 0
+
+    for track_id, title, artist, names, album, seconds in tracks:
+        first_add = add_count
+        for name in names:
+            adds += STRING_ID.pack(string_id(name))
+            add_count += 1
+
+        records += RECORD.pack(track_id, string_id(title), string_id(artist),
+                               string_id(album), first_add,
+                               add_count - first_add, seconds if seconds is not None else -1)
+        count += 1
+
+    offsets = bytearray()
+    position = 0
+    for data in strings:
+        offsets += OFFSET.pack(position)
+        position += len(data)
+    offsets += OFFSET.pack(position)
+
+    offsets_at = HEADER.size
+    records_at = offsets_at + len(offsets) + position
+    adds_at = records_at + len(records)
+
+    header = HEADER.pack(MAGIC, VERSION, count, len(strings), offsets_at, records_at, adds_at)
+    return [header, offsets] + strings + [records, adds]
+
+
+class Snapshot:
+    def __init__(self, filename):
+        with open(filename, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            (magic, version, self.count, self.string_count,
+             self.offsets_at, self.records_at, self.adds_at) = HEADER.unpack_from(self.map, 0)
+        except struct.error:
+            self.close()
+            raise ValueError("Snapshot is truncated")
+
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError("Not a snapshot of this version")
+
+        # every section must lie inside the file, in the order they were written
+        self.strings_at = self.offsets_at + OFFSET.size * (self.string_count + 1)
+        size = len(self.map)
+        if not (self.offsets_at == HEADER.size
+                and self.strings_at <= self.records_at
+                and self.records_at + RECORD.size * self.count == self.adds_at
+                and self.adds_at <= size
+                and (size - self.adds_at) % STRING_ID.size == 0):
+            self.close()
+            raise ValueError("Snapshot is truncated or damaged")
+
+        self.string_bytes = self.records_at - self.strings_at
+        self.add_total = (size - self.adds_at) // STRING_ID.size
+        self.cache = {}       # string id -> decoded str, filled on first use
+
+
+
+    # STRING BY ID
+    # Strings are decoded from the mapped file only when a track needs them.
+    # A reference outside the file raises ValueError, bad utf-8 UnicodeDecodeError.
+    # -----------------------------------------------------------
+
+    def string(self, index):
+        text = self.cache.get(index)
+        if text is None:
+            if index >= self.string_count:
+                raise ValueError("Snapshot refers to a missing string")
+            start, end = struct.unpack_from("<QQ", self.map, self.offsets_at + OFFSET.size * index)
+            if not start <= end <= self.string_bytes:
+                raise ValueError("Snapshot string is out of bounds")
+            text = self.map[self.strings_at + start:self.strings_at + end].decode("utf-8")
+            self.cache[index] = text
+        return text
+
+    def make_track(self, track_id, title, artist, album, first_add, add_count, seconds):
+        adds = NO_ADDS
+        if add_count > 0:
+            if first_add + add_count > self.add_total:
+                raise ValueError("Snapshot refers to missing additional artists")
+            adds = LinkedList()
+            for i in range(first_add, first_add + add_count):
+                adds.add(self.string(STRING_ID.unpack_from(self.map, self.adds_at + STRING_ID.size * i)[0]))
+
+        return Track(self.string(title), self.string(artist), adds,
+                     self.string(album), seconds if seconds >= 0 else None, track_id)
+
+    def track(self, index):
+        return self.make_track(*RECORD.unpack_from(self.map, self.records_at + RECORD.size * index))
+
+    def iter_tracks(self):
+        for record in RECORD.iter_unpack(self.map[self.records_at:self.adds_at]):
+            yield self.make_track(*record)
+
+    def close(self):
+        self.map.close()
@@ -0,0 +1,88 @@
+from bisect import bisect_left
+
+
+class SortedView:
+    def __init__(self):
+        self.keys = []       # sort keys in display order
+        self.tracks = []     # tracks, parallel to self.keys
+        self.key_of = {}     # track -> its sort key, needed to find it again on removal
+        self.pending = []    # (key, track) pairs added since the last read
+
+
+
+    # SORT KEY
+    # Title, artist and album are casefolded once per track instead of on every comparison.
+    # The track id keeps equal tracks in the order they were added.
+    # -----------------------------------------------------------
+
+    def sort_key(self, track):
+        return (track.title.casefold(), track.artist.casefold(),
+                track.album.casefold(), track.seconds or 0, track.id)
+
+    def add(self, track):
+        if track in self.key_of:
+            return
+
+        key = self.sort_key(track)
+        self.pending.append((key, track))
+        self.key_of[track] = key
+
+
+
+    # MERGE PENDING TRACKS
+    # A few new tracks are binary-searched into place. A bulk load (startup, import)
+    # is sorted once instead of paying for thousands of list inserts.
+    # -----------------------------------------------------------
+
+    def flush(self):
+        if not self.pending:
+            return
+
+        if len(self.pending) <= 64:
+            for key, track in self.pending:
+                position = bisect_left(self.keys, key)
+                self.keys.insert(position, key)
+                self.tracks.insert(position, track)
+        else:
+            merged = list(zip(self.keys, self.tracks))
+            merged.extend(self.pending)
+            merged.sort(key=lambda pair: pair[0])
+            self.keys = [pair[0] for pair in merged]
+            self.tracks = [pair[1] for pair in merged]
+        self.pending.clear()
+
+    def remove(self, track):
+        key = self.key_of.pop(track, None)
+        if key is None:
+            return False
+
+        self.flush()
+        position = bisect_left(self.keys, key)
+        del self.keys[position]
+        del self.tracks[position]
+        return True
+
+    def clear(self):
+        self.keys.clear()
+        self.tracks.clear()
+        self.key_of.clear()
+        self.pending.clear()
+
+    def iter(self):
+        self.flush()
+        return iter(self.tracks)
+
+    def as_list(self):
+        # the view's own list, for paging by index; don't modify it
+        self.flush()
+        return self.tracks
+
+    def iter_from(self, start):
+        self.flush()
+        position = start
+        while position < len(self.tracks):
+            yield self.tracks[position]
+            position += 1
+
+    def __len__(self):
+        return len(self.key_of)
@@ -0,0 +1,106 @@
+import io
+import json
+import random
+
+import pytest
+
+import importer
+from importer import iter_records, iter_batches, normalise_batch
+
+
+def random_value(rng, depth=0):
+    kind = rng.randrange(7 if depth < 2 else 4)
+    if kind == 0:
+        return rng.choice([0, -7, 12345678901234567890, 3.25, -1e-7, 1.5e300])
+    if kind == 1:
+        return rng.choice([True, False, None])
+    if kind in (2, 3):
+        return "".join(rng.choice('ab "\\/\n\té€😀,]}[{:') for _ in range(rng.randint(0, 12)))
+    if kind == 4:
+        return [random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return {f"k{i}": random_value(rng, depth + 1) for i in range(rng.randint(0, 4))}
+
+
+def random_records(rng):
+    records = []
+    for _ in range(rng.randint(0, 12)):
+        record = {"title": random_value(rng), "artist": "a"}
+        if rng.random() < 0.3:
+            record = random_value(rng, 1)
+        records.append(record)
+    return records
+
+
+def space(rng):
+    return rng.choice(["", " ", "\n", " \r\n\t "])
+
+
+
+# CHUNK BOUNDARIES
+# The same text read at every chunk size from 1 up must give the records
+# json.loads gives, for arrays and for NDJSON.
+# -----------------------------------------------------------
+
+@pytest.mark.parametrize("seed", range(25))
+def test_array_at_every_chunk_size(monkeypatch, seed):
+    rng = random.Random(seed)
+    records = random_records(rng)
+    parts = [json.dumps(record, ensure_ascii=rng.random() < 0.5) for record in records]
+    text = space(rng) + "[" + space(rng) + (space(rng) + "," + space(rng)).join(parts) + space(rng) + "]" + space(rng)
+    assert json.loads(text) == records
+
+    for size in range(1, len(text) + 2):
+        monkeypatch.setattr(importer, "CHUNK_SIZE", size)
+        assert list(iter_records(io.StringIO(text))) == records
+
+
+@pytest.mark.parametrize("seed", range(25))
+@pytest.mark.parametrize("raw", [False, True])
+def test_ndjson_at_every_chunk_size(monkeypatch, seed, raw):
+    rng = random.Random(seed)
+    records = [record for record in random_records(rng) if isinstance(record, dict)]
+    lines = [json.dumps(record) for record in records]
+    text = "\n".join(line + rng.choice(["", " "]) for line in lines) + rng.choice(["", "\n", "\n\n"])
+    if text.startswith("[") or not records:
+        return
+
+    for size in range(1, len(text) + 2):
+        monkeypatch.setattr(importer, "CHUNK_SIZE", size)
+        found = list(iter_records(io.StringIO(text), raw=raw))
+        if raw:
+            found = [json.loads(line) for line in found]
+        assert found == records
+
+
+@pytest.mark.parametrize("text", [
+    '[{"a":1} {"b":2}]', '[{"a":1},,{"b":2}]', '[1 2]', '[1,]', '[,1]', '[1', '[{"a":', '[1] ',
+])
+def test_malformed_array(monkeypatch, text):
+    for size in (1, 2, 3, 64):
+        monkeypatch.setattr(importer, "CHUNK_SIZE", size)
+        if text == '[1] ':
+            assert list(iter_records(io.StringIO(text))) == [1]
+            continue
+        with pytest.raises(ValueError):
+            list(iter_records(io.StringIO(text)))
+
+
+
+# STOPPING AT A BAD RECORD
+# The records before a malformed one are still handed out.
+# -----------------------------------------------------------
+
+def test_batches_before_a_bad_record_are_kept():
+    text = "".join(json.dumps({"title": f"t{i}"}) + "\n" for i in range(12)) + "{bad\n"
+    batches = iter_batches(iter_records(io.StringIO(text)), size=5)
+    seen = []
+    with pytest.raises(ValueError):
+        for batch in batches:
+            seen.extend(batch)
+    assert [record["title"] for record in seen] == [f"t{i}" for i in range(12)]
+
+
+def test_normalise_batch_stops_at_a_bad_record():
+    records, error = normalise_batch([{"title": "a", "artist": None, "additional_artists": None}, 7, {"title": "b"}])
+    assert records == [("a", "", [], "", None)]
+    assert error is not None
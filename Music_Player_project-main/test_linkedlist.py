@@ -0,0 +1,85 @@
+import random
+
+import pytest
+
+import linkedlist
+from linkedlist import LinkedList
+
+
+# RANDOMIZED CHECK AGAINST A PYTHON LIST
+# A small BLOCK makes the node index split, merge and drop blocks all the time.
+# The model is the list of node handles in order.
+# -----------------------------------------------------------
+
+def check(items, model, rng):
+    assert items.size == len(model)
+    assert list(items.iter_nodes()) == model
+    assert items.head is (model[0] if model else None)
+    assert items.tail is (model[-1] if model else None)
+    if items.indexed:
+        assert list(items.nodes) == model
+        assert len(items.nodes) == len(model)
+    for i in rng.sample(range(len(model)), min(5, len(model))):
+        assert items.node_at(i) is model[i]
+        assert items.get(i) == model[i].data
+        if items.indexed:
+            assert items.position(model[i]) == i
+
+
+@pytest.mark.parametrize("seed", range(40))
+@pytest.mark.parametrize("indexed", [True, False])
+def test_matches_python_list(monkeypatch, seed, indexed):
+    monkeypatch.setattr(linkedlist, "BLOCK", 8)
+    rng = random.Random(seed)
+    items = LinkedList(indexed=indexed)
+    model = []
+
+    for _ in range(300):
+        op = rng.random()
+        if op < 0.25:
+            model.append(items.add(rng.randrange(30)))
+        elif op < 0.35:
+            items.extend(rng.randrange(30) for _ in range(rng.randint(0, 40)))
+            model = list(items.iter_nodes())
+        elif op < 0.5:
+            other = LinkedList(indexed=rng.random() < 0.5)
+            other.extend(rng.randrange(30) for _ in range(rng.randint(0, 40)))
+            moved = list(other.iter_nodes())
+            at = rng.randrange(-1, len(model)) if model else -1
+            items.splice_after(model[at] if at >= 0 else None, other)
+            model[at + 1:at + 1] = moved
+            assert other.size == 0 and other.head is None
+        elif op < 0.65 and model:
+            i = rng.randrange(len(model))
+            assert items.remove_at(i)
+            model.pop(i)
+        elif op < 0.75 and model:
+            i = rng.randrange(len(model))
+            assert items.remove_node(model.pop(i))
+        elif op < 0.78:
+            items.clear()
+            model = []
+        elif op < 0.8:
+            mapping = {}
+            copied = items.copy(mapping)
+            assert [node.data for node in copied.iter_nodes()] == [node.data for node in model]
+            assert [mapping[node] for node in model] == list(copied.iter_nodes())
+        else:
+            data = rng.randrange(30)
+            expected = next((i for i, node in enumerate(model) if node.data == data), -1)
+            assert items.index_of(data) == expected
+
+        check(items, model, rng)
+
+    assert not items.remove_at(len(model))
+    assert items.node_at(-1) is None
+
+
+def test_removed_node_has_no_position():
+    items = LinkedList(indexed=True)
+    node = items.add("a")
+    items.add("b")
+    assert items.remove_node(node)
+    assert items.position(node) == -1
+    assert not items.remove_node(node)
+    assert items.index_of("a") == -1
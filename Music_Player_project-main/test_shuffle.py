@@ -0,0 +1,108 @@
+import random
+
+import pytest
+
+import models
+from linkedlist import LinkedList
+from models import MusicQueue, Track
+from shuffle import LazyShuffle
+
+
+def make_tracks(count, start=0):
+    return [Track(f"t{i}", "artist", LinkedList(), "album", 60) for i in range(start, start + count)]
+
+
+
+# LAZY SHUFFLE ON ITS OWN
+# One round hands out every position exactly once, also when positions are
+# added (grow) or taken out of turn (take) while the round is running.
+# -----------------------------------------------------------
+
+@pytest.mark.parametrize("seed", range(30))
+def test_round_visits_every_position_once(seed):
+    rng = random.Random(seed)
+    size = rng.randint(1, 60)
+    shuffle = LazyShuffle(size, first=rng.randrange(size), seed=seed)
+
+    while True:
+        if rng.random() < 0.1:
+            added = rng.randint(1, 5)
+            shuffle.grow(added)
+            if rng.random() < 0.5:       # play next: the new positions come up right away
+                for i in range(added):
+                    shuffle.take(shuffle.size - added + i, at=len(shuffle.history))
+        if shuffle.draw() is None:
+            break
+
+    assert sorted(shuffle.history) == list(range(shuffle.size))
+
+    played = len(shuffle.history)
+    shuffle.restart()
+    while shuffle.draw() is not None:
+        pass
+    assert sorted(shuffle.history[played:]) == list(range(shuffle.size))
+
+
+def test_state_round_trips():
+    shuffle = LazyShuffle(50, first=7, seed=3)
+    for _ in range(20):
+        shuffle.draw()
+    copy = LazyShuffle.from_dict(shuffle.to_dict())
+    assert [copy.draw() for _ in range(30)] == [shuffle.draw() for _ in range(30)]
+
+
+@pytest.mark.parametrize("change", [
+    {"drawn": 51}, {"history": [50]}, {"swaps": [[0, -1]]}, {"size": 2.5}, {"drawn": True},
+])
+def test_state_that_does_not_fit_is_rejected(change):
+    data = LazyShuffle(50, first=7, seed=3).to_dict()
+    data.update(change)
+    with pytest.raises((ValueError, TypeError)):
+        LazyShuffle.from_dict(data)
+
+
+
+# LAZY SHUFFLE THROUGH THE QUEUE
+# next() until "end" plays every queued track once, including tracks added
+# with play next (which must come up straight away) and with append.
+# -----------------------------------------------------------
+
+@pytest.mark.parametrize("seed", range(20))
+def test_queue_round_plays_every_track_once(monkeypatch, seed):
+    monkeypatch.setattr(models, "LAZY_SHUFFLE_SIZE", 0)
+    rng = random.Random(seed)
+    random.seed(seed)
+
+    queue = MusicQueue()
+    queue.append_tracks(make_tracks(rng.randint(2, 40)))
+    queue.current_node = queue.tracks.node_at(rng.randrange(queue.tracks.size))
+    assert queue.shuffle_on()
+    assert queue.shuffler is not None
+
+    played = [queue.current_node]
+    expected = []         # tracks queued with play next, in the order they must come
+    added = 0
+    while True:
+        if rng.random() < 0.1:
+            new = make_tracks(rng.randint(1, 4), 1000 + added)
+            added += len(new)
+            if rng.random() < 0.5:
+                queue.play_next(new)
+                expected = new + expected
+            else:
+                queue.append_tracks(new)
+
+        if queue.next() == "end":
+            break
+        played.append(queue.current_node)
+        if expected:
+            assert queue.current_node.data is expected.pop(0)
+
+    assert len(played) == queue.tracks.size
+    assert set(played) == set(queue.tracks.iter_nodes())
+
+    # previous walks the same order back
+    for node in reversed(played[:-1]):
+        assert queue.previous() == "moved"
+        assert queue.current_node is node
+    assert queue.previous() == "start"
@@ -0,0 +1,92 @@
+import sys
+import threading
+import time
+
+DEBOUNCE = 0.5       # seconds without a new request before pending writes run
+MAX_DELAY = 5.0      # writes never wait longer than this, even during a burst of edits
+
+
+# BACKGROUND WRITER
+# Disk writes are handed to one worker thread by name. Scheduling the same
+# name again before it ran replaces the earlier request, so many edits in a
+# short time end up as a single write. flush() runs everything pending and
+# waits for it; close() does the same and stops the thread.
+# -----------------------------------------------------------
+
+class BackgroundWriter:
+    def __init__(self, debounce=DEBOUNCE, max_delay=MAX_DELAY):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.pending = {}           # name -> callable, in the order first scheduled
+        self.first = 0.0            # when the oldest pending request came in
+        self.last = 0.0             # when the newest one came in
+        self.running = False        # a batch is being written right now
+        self.hurry = False          # flush() asked for the pending writes now
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.work, name="background-writer", daemon=True)
+        self.thread.start()
+
+    def schedule(self, name, action):
+        with self.condition:
+            if self.closed:
+                action()
+                return
+            now = time.monotonic()
+            if not self.pending:
+                self.first = now
+            self.last = now
+            self.pending[name] = action
+            self.condition.notify_all()
+
+    def flush(self):
+        with self.condition:
+            self.hurry = True
+            self.condition.notify_all()
+            while self.pending or self.running:
+                self.condition.wait()
+            self.hurry = False
+
+    def close(self):
+        with self.condition:
+            if self.closed:
+                return
+        self.flush()
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
+
+
+
+    # WORKER THREAD
+    # -----------------------------------------------------------
+
+    def work(self):
+        while True:
+            with self.condition:
+                while not self.closed:
+                    if self.pending:
+                        now = time.monotonic()
+                        due = min(self.last + self.debounce, self.first + self.max_delay)
+                        if self.hurry or now >= due:
+                            break
+                        self.condition.wait(due - now)
+                    else:
+                        self.condition.wait()
+
+                if not self.pending:
+                    return
+                batch = list(self.pending.values())
+                self.pending = {}
+                self.running = True
+
+            for action in batch:
+                try:
+                    action()
+                except Exception as e:
+                    print(f"\nBackground save failed: {e}", file=sys.stderr)
+
+            with self.condition:
+                self.running = False
+                self.condition.notify_all()